@@ -49,10 +49,18 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tickets.middleware.RoleMiddleware',
+    'tickets.middleware.HistoryActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+AUTHENTICATION_BACKENDS = [
+    'tickets.backends.ProfileModelBackend',
+    # Keeps sessions created before the profile backend was added valid
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 ROOT_URLCONF = 'helpDesk.urls'
 
 TEMPLATES = [
@@ -85,6 +93,18 @@ DATABASES = {
 }
 
 
+# Cache
+# The version stamps that invalidate cached stats and reports are kept in the
+# database, so cached entries stay correct with this per-process cache; a
+# shared backend such as Redis or Memcached also lets workers share them,
+# and is needed for the warm_report_cache command to reach the workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Ticket, TicketAttachment, TicketComment
+
+
+# Denormalized activity columns on Ticket kept in step with comments and attachments
+ACTIVITY_FIELDS = ['comment_count', 'attachment_count', 'last_activity_at', 'last_public_comment_at']
+
+
+def _latest(model, date_field, **filters):
+    return Subquery(
+        model.objects.filter(ticket=OuterRef('pk'), **filters)
+        .order_by().values('ticket').annotate(latest=Max(date_field)).values('latest')
+    )
+
+
+def _count(model):
+    return Coalesce(Subquery(
+        model.objects.filter(ticket=OuterRef('pk'))
+        .order_by().values('ticket').annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def last_activity_expression():
+    """Latest comment or attachment, or NULL when there is none"""
+    comment = _latest(TicketComment, 'created_at')
+    attachment = _latest(TicketAttachment, 'uploaded_at')
+    # Coalescing each side with the other keeps NULLs out of GREATEST, which
+    # databases disagree on
+    return Greatest(Coalesce(comment, attachment), Coalesce(attachment, comment))
+
+
+def activity_expressions():
+    """Expressions recomputing every activity column from the child tables"""
+    return {
+        'comment_count': _count(TicketComment),
+        'attachment_count': _count(TicketAttachment),
+        'last_activity_at': last_activity_expression(),
+        'last_public_comment_at': _latest(TicketComment, 'created_at', is_internal=False),
+    }
+
+
+def comment_added(comment):
+    updates = {
+        'comment_count': F('comment_count') + 1,
+        'last_activity_at': Greatest(Coalesce(F('last_activity_at'), comment.created_at), comment.created_at),
+    }
+    if not comment.is_internal:
+        updates['last_public_comment_at'] = comment.created_at
+    Ticket.objects.filter(pk=comment.ticket_id).update(**updates)
+    if not comment.is_internal:
+        record_first_response(comment)
+
+
+def record_first_response(comment):
+    """
+    Stamp the ticket's first response if this public comment is it.
+
+    The conditional UPDATE only matches while no response is recorded and
+    the author isn't the submitter, so concurrent replies can't both win.
+    """
+    from .tracking import TRACKED_FIELDS, record_changes
+    
+    with transaction.atomic():
+        stamped = Ticket.objects.filter(
+            pk=comment.ticket_id, first_response_at__isnull=True,
+        ).exclude(submitter_id=comment.author_id).update(
+            first_response_at=comment.created_at, first_responder_id=comment.author_id,
+        )
+        if stamped:
+            after = Ticket.objects.filter(pk=comment.ticket_id).values(*TRACKED_FIELDS).get()
+            record_changes([({**after, 'first_response_at': None, 'first_responder_id': None}, after)])
+
+
+def comment_removed(comment):
+    # The latest timestamps may have belonged to the removed comment
+    Ticket.objects.filter(pk=comment.ticket_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        last_activity_at=last_activity_expression(),
+        last_public_comment_at=_latest(TicketComment, 'created_at', is_internal=False),
+    )
+
+
+def attachment_added(attachment):
+    Ticket.objects.filter(pk=attachment.ticket_id).update(
+        attachment_count=F('attachment_count') + 1,
+        last_activity_at=Greatest(Coalesce(F('last_activity_at'), attachment.uploaded_at), attachment.uploaded_at),
+    )
+
+
+def attachment_removed(attachment):
+    Ticket.objects.filter(pk=attachment.ticket_id).update(
+        attachment_count=Greatest(F('attachment_count') - 1, 0),
+        last_activity_at=last_activity_expression(),
+    )
+
+
+def stale_activity():
+    """Tickets whose activity columns disagree with their comments and attachments"""
+    expected = activity_expressions()
+    annotated = Ticket.objects.order_by().annotate(
+        **{f'expected_{field}': expression for field, expression in expected.items()}
+    )
+    stale = []
+    for row in annotated.values('pk', *ACTIVITY_FIELDS, *(f'expected_{field}' for field in ACTIVITY_FIELDS)).iterator():
+        if any(row[field] != row[f'expected_{field}'] for field in ACTIVITY_FIELDS):
+            stale.append(row['pk'])
+    return stale
+
+
+def reconcile_activity(ticket_ids=None):
+    """Recompute the activity columns in one UPDATE; returns the rows updated"""
+    tickets = Ticket.objects.all()
+    if ticket_ids is not None:
+        tickets = tickets.filter(pk__in=ticket_ids)
+    return tickets.update(**activity_expressions())
@@ -2,13 +2,13 @@ from django.contrib import admin
 from .models import (
     Department, Category, Priority, UserProfile,
     Ticket, TicketComment, TicketAttachment, TicketHistory,
-    KnowledgeBase, SLA
+    KnowledgeBase, SLA, BulkActionJob, ExportJob
 )
 
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'is_active', 'created_at')
+    list_display = ('name', 'email', 'ticket_prefix', 'is_active', 'created_at')
     search_fields = ('name',)
     list_filter = ('is_active',)
 
@@ -38,7 +38,7 @@ class TicketAdmin(admin.ModelAdmin):
     search_fields = ('ticket_number', 'title')
     list_filter = ('status', 'department', 'priority')
     date_hierarchy = 'created_at'
-    readonly_fields = ('ticket_number',)
+    readonly_fields = ('ticket_number', 'response_due_at', 'resolution_due_at')
 
 
 @admin.register(TicketComment)
@@ -70,3 +70,17 @@ class KnowledgeBaseAdmin(admin.ModelAdmin):
 class SLAAdmin(admin.ModelAdmin):
     list_display = ('name', 'department', 'priority', 'response_time', 'resolution_time', 'is_active')
     list_filter = ('department', 'priority', 'is_active')
+
+
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    list_display = ('action', 'user', 'status', 'processed', 'created_at', 'finished_at')
+    list_filter = ('status', 'action')
+    readonly_fields = ('ticket_ids', 'stats', 'error')
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'format', 'status', 'rows_written', 'total', 'created_at', 'finished_at')
+    list_filter = ('status', 'format')
+    readonly_fields = ('filters', 'fingerprint', 'file', 'last_id', 'bytes_written', 'error')
@@ -0,0 +1,95 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+
+def write_rows(model, fields, updates):
+    """
+    Store ``(pk, values)`` pairs, ``values`` in the order of ``fields``.
+
+    One parameterised UPDATE run with ``executemany``; ``bulk_update``
+    compiles a CASE expression per row, which dominates at bulk volumes.
+    Like ``update()``, this bypasses ``save()`` and signals.
+    """
+    if not updates:
+        return
+    model_fields = [model._meta.get_field(field) for field in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in model_fields)
+    sql = f"UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s"
+    params = [
+        [field.get_db_prep_save(value, connection) for field, value in zip(model_fields, values)] + [pk]
+        for pk, values in updates
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _matching(key_fields, keys):
+    """Q matching at least every row whose ``key_fields`` equal one of ``keys``"""
+    condition = Q()
+    for position, name in enumerate(key_fields):
+        values = {key[position] for key in keys}
+        match = Q(**{f'{name}__in': values - {None}})
+        if None in values:
+            match |= Q(**{f'{name}__isnull': True})
+        condition &= match
+    return condition
+
+
+def _existing_rows(model, key_fields, keys):
+    """Primary keys of the rows whose ``key_fields`` equal one of ``keys``, by key"""
+    return {
+        tuple(row[:-1]): row[-1]
+        for row in model.objects.filter(_matching(key_fields, keys)).values_list(*key_fields, 'pk')
+    }
+
+
+def add_to_rows(model, key_fields, increments):
+    """
+    Add ``{key: {field: delta}}`` increments to the rows whose ``key_fields``
+    equal each key, creating the rows that don't exist yet.
+
+    One SELECT finds the existing rows and one ``executemany`` UPDATE adds
+    to them in the database, so concurrent updates never lose increments.
+    The rest are inserted with one ``bulk_create`` in a savepoint; when a
+    concurrent writer inserted one of those keys first, the unique
+    constraint rejects the batch and its keys are retried as updates.
+    Keys holding a NULL never conflict, so racing writers can leave two
+    rows for one; readers sum the rows of each key.
+    """
+    increments = {key: deltas for key, deltas in increments.items() if any(deltas.values())}
+    if not increments:
+        return
+
+    fields = sorted({field for deltas in increments.values() for field in deltas})
+    model_fields = [model._meta.get_field(field) for field in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = {quote(field.column)} + %s' for field in model_fields)
+    sql = f"UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s"
+
+    while increments:
+        existing = _existing_rows(model, key_fields, increments)
+        params = []
+        missing = {}
+        for key, deltas in increments.items():
+            if key in existing:
+                params.append([
+                    field.get_db_prep_save(deltas.get(field.name, field.get_default()), connection)
+                    for field in model_fields
+                ] + [existing[key]])
+            else:
+                missing[key] = deltas
+
+        if params:
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, params)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([
+                    model(**dict(zip(key_fields, key)), **deltas) for key, deltas in missing.items()
+                ])
+        except IntegrityError:
+            # Created by another writer since the SELECT; add to it instead
+            increments = missing
+        else:
+            return
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters, stats_cache
+from .events import publish_on_commit
+from .history import write_entries
+from .models import Ticket, TicketHistory
+
+
+# Tickets stamped per transaction by the scanner
+BREACH_SCAN_BATCH_SIZE = getattr(settings, 'BREACH_SCAN_BATCH_SIZE', 500)
+
+# Seconds between passes of ``scan_ticket_breaches --loop``
+BREACH_SCAN_INTERVAL = getattr(settings, 'BREACH_SCAN_INTERVAL', 60)
+
+BREACH_ACTION = 'SLA breached'
+
+# Columns read for each breach, for the history rows, the event payload and
+# the stats scopes to invalidate
+BREACH_FIELDS = ['id', 'ticket_number', 'due_date', 'department_id', 'assigned_to_id', 'submitter_id']
+
+
+def newly_breached(now=None):
+    """Active tickets past their due date that have not been stamped yet"""
+    return Ticket.objects.filter(
+        status__in=Ticket.ACTIVE_STATUSES,
+        breached_at__isnull=True,
+        due_date__lt=now or timezone.now(),
+    )
+
+
+def record_breaches(rows):
+    """
+    Write a history row per breached ticket and announce them on the
+    ``breaches`` channel once the transaction commits.
+    """
+    write_entries([
+        TicketHistory(
+            ticket_id=row['id'],
+            action=BREACH_ACTION,
+            new_value=timezone.localtime(row['due_date']).strftime('%Y-%m-%d %H:%M'),
+        )
+        for row in rows
+    ])
+    publish_on_commit('breaches', {
+        'tickets': [
+            {
+                'id': row['id'],
+                'ticket_number': row['ticket_number'],
+                'due_date': row['due_date'].isoformat(),
+                'department_id': row['department_id'],
+                'assigned_to_id': row['assigned_to_id'],
+            }
+            for row in rows
+        ],
+    })
+
+
+def scan_breaches(now=None, batch_size=BREACH_SCAN_BATCH_SIZE):
+    """
+    Stamp ``breached_at`` on tickets that went past due since the last scan.
+
+    Each batch is found through the (status, breached_at, due_date) index,
+    stamped with one UPDATE and recorded with one ``bulk_create``, in its own
+    transaction. ``breached_at`` is the due date itself, so the stamp is
+    exact however late the scan runs. Returns the number of breaches.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            batch = newly_breached(now).order_by('due_date', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Concurrent scanners split the backlog instead of queueing
+                batch = batch.select_for_update(skip_locked=True)
+            rows = list(batch.values(*BREACH_FIELDS)[:batch_size])
+            if not rows:
+                break
+            Ticket.objects.filter(id__in=[row['id'] for row in rows]).update(breached_at=F('due_date'))
+            record_breaches(rows)
+            # The update skips the save hooks; cached reports count breaches
+            stats_cache.invalidate(set().union(*[stats_cache.scopes_for_ticket(row) for row in rows]))
+        total += len(rows)
+
+    # The same tickets move to the overdue counter buckets
+    counters.sweep_overdue(now)
+    return total
+
+
+def check_breach(ticket):
+    """
+    Bring a ticket's breach stamp in line with its due date before saving.
+
+    An active ticket's stamp is its due date, so it is cleared whenever the
+    deadline moves; the scanner stamps and records the new deadline once it
+    has passed. Tickets finished after their due date that the scanner never
+    saw are stamped here. Returns True in the latter case; the caller then
+    records the breach once the ticket is saved.
+    """
+    active = ticket.status in Ticket.ACTIVE_STATUSES
+    if ticket.breached_at is not None:
+        if active and ticket.due_date != ticket.breached_at:
+            ticket.breached_at = None
+        return False
+
+    finished_at = ticket.resolved_at or ticket.closed_at
+    if not active and ticket.due_date is not None and finished_at is not None and finished_at > ticket.due_date:
+        ticket.breached_at = ticket.due_date
+        return True
+    return False
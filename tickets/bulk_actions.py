@@ -0,0 +1,183 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .batch import write_rows
+from .breaches import BREACH_FIELDS, check_breach, record_breaches
+from .history import history_entries, write_entries
+from .jobs import submit_on_commit
+from .models import BulkActionJob, Ticket
+from .permissions import get_role
+from .sla import get_sla_engine
+from .tracking import TRACKED_FIELDS, record_changes
+
+
+# Tickets read, updated and audited per transaction
+BULK_ACTION_CHUNK_SIZE = getattr(settings, 'BULK_ACTION_CHUNK_SIZE', 500)
+
+# Selections larger than this run as a BulkActionJob instead of in the request
+BULK_ACTION_BACKGROUND_THRESHOLD = getattr(settings, 'BULK_ACTION_BACKGROUND_THRESHOLD', 1000)
+
+# Form field holding each action's parameter
+ACTIONS = {
+    'assign': 'assigned_to',
+    'status': 'status',
+    'priority': 'priority',
+    'close': None,
+}
+
+# Columns a bulk action can change; written back together for each changed ticket
+WRITE_FIELDS = [
+    'status', 'assigned_to_id', 'priority_id', 'resolved_at', 'closed_at',
+    'due_date', 'response_due_at', 'resolution_due_at', 'breached_at', 'updated_at',
+]
+
+READ_FIELDS = list(dict.fromkeys(['id', 'ticket_number', 'created_at', *TRACKED_FIELDS, *WRITE_FIELDS]))
+
+HISTORY_ACTION = 'Bulk update'
+
+
+def action_values(action, cleaned_data):
+    """
+    JSON-safe parameters of an action from the bulk action form, or None
+    when the action's parameter is missing.
+    """
+    field = ACTIONS[action]
+    if field is None:
+        return {}
+    value = cleaned_data.get(field)
+    if not value:
+        return None
+    return {field: getattr(value, 'pk', value)}
+
+
+def apply_action(ticket, action, values, now):
+    """Change an unsaved ticket the way the action and ``Ticket.save`` would"""
+    if action == 'assign':
+        ticket.assigned_to_id = values['assigned_to']
+    elif action == 'status':
+        ticket.status = values['status']
+    elif action == 'priority':
+        ticket.priority_id = values['priority']
+    elif action == 'close':
+        ticket.status = 'closed'
+    else:
+        raise ValueError(f"Unknown bulk action {action!r}")
+    ticket.set_status_timestamps(now)
+
+
+def _run_chunk(ids, action, values, user_id, scope, now, stats):
+    engine = get_sla_engine()
+    with transaction.atomic():
+        # Old values of the whole chunk, limited to tickets the user may edit
+        rows = list(Ticket.objects.filter(scope, id__in=ids).values(*READ_FIELDS))
+        stats['skipped'] += len(ids) - len(rows)
+
+        updates = []
+        changes = []
+        entries = []
+        breaches = []
+        for row in rows:
+            ticket = Ticket(**row)
+            previous = {field: row[field] for field in TRACKED_FIELDS}
+            apply_action(ticket, action, values, now)
+            engine.apply(ticket, previous)
+            if check_breach(ticket):
+                breaches.append({field: getattr(ticket, field) for field in BREACH_FIELDS})
+
+            after = {field: getattr(ticket, field) for field in WRITE_FIELDS if field != 'updated_at'}
+            if all(row[field] == value for field, value in after.items()):
+                stats['unchanged'] += 1
+                continue
+            ticket.updated_at = now
+            updates.append((row['id'], [getattr(ticket, field) for field in WRITE_FIELDS]))
+            changes.append((previous, {field: getattr(ticket, field) for field in TRACKED_FIELDS}))
+            entries.extend(history_entries(row['id'], row, after, user_id, HISTORY_ACTION))
+
+        write_rows(Ticket, WRITE_FIELDS, updates)
+        stats['history_rows'] += write_entries(entries)
+        if breaches:
+            record_breaches(breaches)
+        record_changes(changes)
+
+        stats['updated'] += len(updates)
+        stats['breaches'] += len(breaches)
+        stats['chunks'] += 1
+
+
+def run_bulk_action(action, values, ticket_ids, user_id=None, scope=None,
+                    chunk_size=BULK_ACTION_CHUNK_SIZE, progress=None):
+    """
+    Apply a bulk action to the tickets in ``ticket_ids`` that match ``scope``.
+
+    The selection is processed ``chunk_size`` tickets at a time, each chunk
+    in its own transaction: one ``values()`` query for the old values, one
+    batched UPDATE, one ``bulk_create`` of history rows. Tickets get the
+    same timestamps, SLA deadlines and breach stamps ``Ticket.save`` would
+    give them. ``progress(done, stats)`` is called inside each chunk's
+    transaction. Returns the statistics of the run.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    if scope is None:
+        scope = Q()
+    ticket_ids = sorted(set(ticket_ids))
+    stats = {
+        'action': action,
+        'selected': len(ticket_ids),
+        'updated': 0,
+        'unchanged': 0,
+        'skipped': 0,
+        'breaches': 0,
+        'history_rows': 0,
+        'chunks': 0,
+    }
+    for start in range(0, len(ticket_ids), chunk_size):
+        chunk = ticket_ids[start:start + chunk_size]
+        _run_chunk(chunk, action, values, user_id, scope, now, stats)
+        if progress is not None:
+            progress(start + len(chunk), stats)
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def queue_bulk_action(user, action, values, ticket_ids):
+    """
+    Store the action as a job for the job runner, which gets it once the
+    request commits; by default the ``process_bulk_actions`` command runs it.
+    """
+    job = BulkActionJob.objects.create(
+        user=user, action=action, values=values, ticket_ids=sorted(set(ticket_ids)),
+    )
+    submit_on_commit('tickets.bulk_actions.run_job', job.pk)
+    return job
+
+
+def run_job(job_id, chunk_size=BULK_ACTION_CHUNK_SIZE):
+    """
+    Run a queued bulk action, resuming after the last committed chunk.
+
+    Re-applying an action is harmless, so a job that died mid-chunk can be
+    set back to pending and run again; see the ``process_bulk_actions``
+    command.
+    """
+    if not BulkActionJob.objects.filter(pk=job_id, status='pending').update(status='running'):
+        return  # Already taken by another runner
+    job = BulkActionJob.objects.select_related('user').get(pk=job_id)
+    offset = job.processed
+
+    def progress(done, stats):
+        BulkActionJob.objects.filter(pk=job_id).update(processed=offset + done, stats=stats)
+
+    try:
+        stats = run_bulk_action(
+            job.action, job.values, job.ticket_ids[offset:], user_id=job.user_id,
+            scope=get_role(job.user).visible_q(), chunk_size=chunk_size, progress=progress,
+        )
+    except Exception as exc:
+        BulkActionJob.objects.filter(pk=job_id).update(status='failed', error=str(exc), finished_at=timezone.now())
+        raise
+    BulkActionJob.objects.filter(pk=job_id).update(status='done', stats=stats, finished_at=timezone.now())
@@ -1,9 +1,19 @@
-from .forms import UserProfileForm 
+from django.utils.functional import SimpleLazyObject
+
+from .forms import UserProfileForm
 from .models import UserProfile
 
+
+def _profile_form(request):
+    # Users without a profile get an unsaved one; the profile view creates
+    # it when the form is actually submitted
+    profile = request.role.profile() or UserProfile(user=request.user)
+    return UserProfileForm(instance=profile, user=request.user)
+
+
 def profile_form_processor(request):
     profile_form = None
     if request.user.is_authenticated:
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile_form = UserProfileForm(instance=profile, user=request.user)
-    return {'profile_form': profile_form}
\ No newline at end of file
+        # Only built if a template actually renders the form
+        profile_form = SimpleLazyObject(lambda: _profile_form(request))
+    return {'profile_form': profile_form}
@@ -0,0 +1,210 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .batch import add_to_rows
+from .models import Ticket, TicketCounter, TicketCounterState
+from .stats import ACTIVE_STATUSES, rollup_stats
+
+
+def get_watermark():
+    """
+    Return the counter state row, creating it on first use.
+
+    Every active ticket due before ``swept_until`` is counted in an overdue
+    bucket; tickets that fell due after it are picked up by ``sweep_overdue``.
+    """
+    state = TicketCounterState.objects.order_by('pk').first()
+    if state is None:
+        state = TicketCounterState.objects.create()
+    return state
+
+
+def counter_key(values, swept_until):
+    """Bucket key for a dict of ticket values"""
+    is_overdue = bool(
+        values['status'] in ACTIVE_STATUSES
+        and values['due_date'] is not None
+        and values['due_date'] < swept_until
+    )
+    return (
+        values['department_id'],
+        values['assigned_to_id'],
+        values['priority_id'],
+        values['status'],
+        is_overdue,
+    )
+
+
+def apply_deltas(deltas):
+    """Add each non-zero delta to its counter row, creating missing rows"""
+    add_to_rows(
+        TicketCounter,
+        ['department_id', 'assigned_to_id', 'priority_id', 'status', 'is_overdue'],
+        {key: {'ticket_count': delta} for key, delta in deltas.items()},
+    )
+
+
+def _grouped_keys(queryset, swept_until):
+    """Count tickets per counter bucket with one grouped query"""
+    overdue = Q(status__in=ACTIVE_STATUSES, due_date__lt=swept_until)
+    rows = queryset.order_by().values(
+        'department_id', 'assigned_to_id', 'priority_id', 'status'
+    ).annotate(
+        total=Count('id'),
+        overdue=Count('id', filter=overdue),
+    )
+
+    keys = Counter()
+    for row in rows:
+        base = (row['department_id'], row['assigned_to_id'], row['priority_id'], row['status'])
+        if row['overdue']:
+            keys[base + (True,)] += row['overdue']
+        if row['total'] - row['overdue']:
+            keys[base + (False,)] += row['total'] - row['overdue']
+    return keys
+
+
+def record_changes(changes):
+    """
+    Move tickets between buckets.
+
+    ``changes`` is a list of ``(before, after)`` value dicts; ``before`` is
+    None for new tickets and ``after`` is None for deleted ones.
+    """
+    swept_until = get_watermark().swept_until
+    deltas = Counter()
+    for before, after in changes:
+        if before is not None:
+            deltas[counter_key(before, swept_until)] -= 1
+        if after is not None:
+            deltas[counter_key(after, swept_until)] += 1
+    apply_deltas(deltas)
+
+
+def reassign_counters(user_id):
+    """Fold a deleted agent's counters into the unassigned buckets"""
+    for counter in TicketCounter.objects.filter(assigned_to_id=user_id):
+        apply_deltas({
+            (counter.department_id, None, counter.priority_id, counter.status, counter.is_overdue):
+                counter.ticket_count,
+        })
+        counter.delete()
+
+
+def sweep_overdue(now=None):
+    """
+    Move tickets that fell due since the last sweep into the overdue buckets.
+
+    Returns the number of tickets moved. The watermark only advances when
+    something moves, so idle sweeps never write.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        state = get_watermark()
+        newly_due = Ticket.objects.filter(
+            status__in=ACTIVE_STATUSES,
+            due_date__gte=state.swept_until,
+            due_date__lt=now,
+        )
+        moved = _grouped_keys(newly_due, now)
+        if not moved:
+            return 0
+
+        # Another worker swept first; its sweep already covers these tickets
+        advanced = TicketCounterState.objects.filter(
+            pk=state.pk, swept_until=state.swept_until
+        ).update(swept_until=now)
+        if not advanced:
+            return 0
+
+        deltas = Counter()
+        for key, count in moved.items():
+            deltas[key] += count
+            deltas[key[:4] + (False,)] -= count
+        apply_deltas(deltas)
+    return sum(moved.values())
+
+
+def counter_ticket_stats(scope=None, now=None):
+    """
+    Same figures as ``compute_ticket_stats`` read from the counter table.
+
+    ``scope`` is a Q object over ``department``/``assigned_to``, which both
+    models share. Tickets that fell due since the last sweep are still in
+    the on-time buckets, so they are added to the overdue total with one
+    narrow ``due_date`` range count.
+    """
+    scope = scope or Q()
+    rows = TicketCounter.objects.filter(scope, ticket_count__gt=0).values(
+        'status', 'priority__name', 'priority__level', 'department__name'
+    ).annotate(
+        count=Sum('ticket_count'),
+        overdue=Coalesce(Sum('ticket_count', filter=Q(is_overdue=True)), 0),
+    )
+    stats = rollup_stats(rows)
+
+    swept_until = TicketCounterState.objects.order_by('pk').values('swept_until')[:1]
+    stats['overdue'] += Ticket.objects.filter(
+        scope,
+        status__in=ACTIVE_STATUSES,
+        due_date__gte=Subquery(swept_until),
+        due_date__lt=now or timezone.now(),
+    ).count()
+    return stats
+
+
+def expected_counters(now):
+    return _grouped_keys(Ticket.objects.all(), now)
+
+
+def current_counters():
+    keys = Counter()
+    rows = TicketCounter.objects.values(
+        'department_id', 'assigned_to_id', 'priority_id', 'status', 'is_overdue'
+    ).annotate(total=Sum('ticket_count'))
+    for row in rows:
+        if row['total']:
+            keys[(row['department_id'], row['assigned_to_id'], row['priority_id'],
+                  row['status'], row['is_overdue'])] = row['total']
+    return keys
+
+
+def rebuild_counters(now=None):
+    """Recount every bucket from the ticket table and reset the watermark"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        expected = expected_counters(now)
+        TicketCounter.objects.all().delete()
+        TicketCounter.objects.bulk_create([
+            TicketCounter(
+                department_id=department_id,
+                assigned_to_id=assigned_to_id,
+                priority_id=priority_id,
+                status=status,
+                is_overdue=is_overdue,
+                ticket_count=count,
+            )
+            for (department_id, assigned_to_id, priority_id, status, is_overdue), count
+            in expected.items()
+        ])
+        state = get_watermark()
+        state.swept_until = now
+        state.save(update_fields=['swept_until'])
+    return expected
+
+
+def verify_counters():
+    """Return ``{key: (stored, expected)}`` for every bucket that disagrees"""
+    with transaction.atomic():
+        swept_until = get_watermark().swept_until
+        expected = expected_counters(swept_until)
+        stored = current_counters()
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
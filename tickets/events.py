@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Queue of events for one streaming client, bound to its event loop"""
+
+    def __init__(self, broker, channels, maxsize=100):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, channel, event):
+        # Publishers run in sync worker threads; hand over to the client's loop
+        self.loop.call_soon_threadsafe(self._put, (channel, event))
+
+    def _put(self, item):
+        if self.queue.full():
+            # A slow client only ever needs the latest events
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+    async def get(self, timeout):
+        """Next ``(channel, event)`` pair, or None once ``timeout`` passes"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        self.broker.add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.remove(self)
+
+
+class LocalBroker:
+    """In-process pub/sub; only clients connected to this worker see events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channels):
+        return Subscription(self, channels)
+
+    def add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+
+    def remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+
+    def publish(self, channel, event):
+        self.dispatch(channel, event)
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.push(channel, event)
+
+
+class DatabaseBroker(LocalBroker):
+    """
+    Relays events through the ``TicketEvent`` table so every worker sees them.
+
+    Each worker runs a single poller on its event loop that reads new rows by
+    primary key and fans them out to its local subscribers, so the database
+    sees one cheap query per worker per interval however many clients are
+    connected.
+    """
+    poll_interval = 1.0
+    retention = timedelta(minutes=5)
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    def publish(self, channel, event):
+        from .models import TicketEvent
+
+        TicketEvent.objects.create(channel=channel, payload=event)
+
+    def add(self, subscription):
+        super().add(subscription)
+        if self._poller is None or self._poller.done():
+            self._poller = subscription.loop.create_task(self._poll())
+
+    async def _poll(self):
+        from .models import TicketEvent
+
+        latest = await TicketEvent.objects.order_by('-pk').values_list('pk', flat=True).afirst()
+        last_id = latest or 0
+        polls = 0
+        while True:
+            async for event in TicketEvent.objects.filter(pk__gt=last_id).order_by('pk')[:500]:
+                last_id = event.pk
+                self.dispatch(event.channel, event.payload)
+
+            polls += 1
+            if polls % 60 == 0:
+                await TicketEvent.objects.filter(
+                    created_at__lt=timezone.now() - self.retention
+                ).adelete()
+            await asyncio.sleep(self.poll_interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker configured by ``TICKET_EVENT_BROKER`` (one instance per process)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'TICKET_EVENT_BROKER', 'tickets.events.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_on_commit(channel, event):
+    """Publish once the surrounding transaction commits, so readers see the change"""
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+def comment_payload(comment):
+    """JSON representation of a comment shared by the AJAX and live endpoints"""
+    return {
+        'id': comment.id,
+        'author': comment.author.get_full_name(),
+        'comment': comment.comment,
+        'is_internal': comment.is_internal,
+        'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M'),
+    }
+
+
+def format_sse(event, data):
+    """Encode one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
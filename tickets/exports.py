@@ -0,0 +1,282 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import zlib
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .forms import TicketFilterForm
+from .jobs import submit_on_commit
+from .models import ExportJob, Ticket
+from .permissions import get_role
+from .reference_data import get_reference_data
+
+
+# Rows fetched per database round trip while exporting
+EXPORT_CHUNK_SIZE = getattr(settings, 'TICKET_EXPORT_CHUNK_SIZE', 2000)
+
+# Bytes of CSV collected before a piece of the stream is handed out
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+EXPORT_HEADER = [
+    'Ticket Number', 'Title', 'Status', 'Priority', 'Department',
+    'Category', 'Submitter', 'Assigned To', 'Created At', 'Resolved At',
+]
+
+EXPORT_FIELDS = [
+    'ticket_number', 'title', 'status', 'priority_id', 'department_id',
+    'category_id', 'submitter_id', 'assigned_to_id', 'created_at', 'resolved_at',
+]
+
+# Keys of each JSON Lines record, in the order of EXPORT_HEADER
+EXPORT_KEYS = [
+    'ticket_number', 'title', 'status', 'priority', 'department',
+    'category', 'submitter', 'assigned_to', 'created_at', 'resolved_at',
+]
+
+STATUS_LABELS = dict(Ticket.STATUS_CHOICES)
+
+# Seconds an export file is reused for identical requests, then purged
+EXPORT_JOB_TTL = getattr(settings, 'TICKET_EXPORT_JOB_TTL', 3600)
+
+
+def _user_names(user_ids):
+    """Full names by user id, as ``User.get_full_name`` builds them"""
+    return {
+        pk: f"{first_name} {last_name}".strip()
+        for pk, first_name, last_name in User.objects.filter(pk__in=user_ids).values_list(
+            'pk', 'first_name', 'last_name'
+        )
+    }
+
+
+def _timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+class RowFormatter:
+    """
+    Turns ``EXPORT_FIELDS`` tuples into export rows.
+
+    Department, category and priority names come from the reference data;
+    user names are looked up once per batch of rows, for the users not
+    seen yet.
+    """
+
+    def __init__(self):
+        data = get_reference_data()
+        self.priorities = {priority.pk: priority.name for priority in data.priorities}
+        self.departments = {department.pk: department.name for department in data.departments}
+        self.categories = {category.pk: category.name for category in data.categories}
+        self.names = {}
+
+    def rows(self, chunk):
+        missing = {user_id for row in chunk for user_id in row[6:8] if user_id is not None} - self.names.keys()
+        if missing:
+            self.names.update(_user_names(missing))
+
+        return [
+            [
+                number,
+                title,
+                STATUS_LABELS.get(status, status),
+                self.priorities.get(priority_id, ''),
+                self.departments.get(department_id, ''),
+                self.categories.get(category_id, ''),
+                self.names.get(submitter_id, ''),
+                self.names.get(assigned_to_id, '') if assigned_to_id else 'Unassigned',
+                _timestamp(created_at),
+                _timestamp(resolved_at),
+            ]
+            for (number, title, status, priority_id, department_id, category_id,
+                 submitter_id, assigned_to_id, created_at, resolved_at) in chunk
+        ]
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Export rows of the tickets in ``queryset``, in its order.
+
+    Tickets are read as tuples through a chunked ``iterator()``, so no
+    model instances are built and only one chunk is held at a time.
+    """
+    formatter = RowFormatter()
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from formatter.rows(chunk)
+
+
+def csv_chunks(rows, header=EXPORT_HEADER, compress=False):
+    """
+    Encode rows as CSV, in pieces of about ``EXPORT_BUFFER_SIZE`` bytes.
+
+    With ``compress`` the pieces form one gzip stream.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            piece = take()
+            if piece:
+                yield piece
+    piece = take()
+    if compressor:
+        piece += compressor.flush()
+    if piece:
+        yield piece
+
+
+async def async_chunks(chunks):
+    """
+    Hand out the pieces of a synchronous stream to an ASGI response.
+
+    Given a plain generator, Django would read it whole with
+    ``sync_to_async(list)`` before sending anything. Each piece is pulled
+    on the same worker thread instead, which also keeps the generator's
+    database cursor on one connection.
+    """
+    take = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            piece = await take(chunks, None)
+            if piece is None:
+                return
+            yield piece
+    finally:
+        # Also reached when the client disconnects mid-download
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def encode_rows(rows, format, header=False):
+    """Export rows as bytes in the job ``format``"""
+    if format == 'jsonl':
+        return ''.join(
+            json.dumps(dict(zip(EXPORT_KEYS, row)), ensure_ascii=False) + '\n' for row in rows
+        ).encode('utf-8')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_HEADER)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def filter_params(form):
+    """The filters of a bound ``TicketFilterForm`` that were filled in"""
+    return {name: form.data[name] for name in form.fields if form.data.get(name)}
+
+
+def export_fingerprint(user, format, filters):
+    payload = json.dumps([user.pk, format, sorted(filters.items())])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def queue_export(user, format, filters):
+    """
+    Export job for the user's filtered tickets, handed to the job runner
+    once the request commits; by default the ``process_export_jobs``
+    command runs it. An identical export requested within ``EXPORT_JOB_TTL`` seconds
+    is reused instead. Returns ``(job, created)``.
+    """
+    fingerprint = export_fingerprint(user, format, filters)
+    job = ExportJob.objects.filter(
+        user=user, fingerprint=fingerprint, status__in=['pending', 'running', 'done'],
+        created_at__gte=timezone.now() - timedelta(seconds=EXPORT_JOB_TTL),
+    ).first()
+    if job is not None:
+        return job, False
+
+    job = ExportJob(user=user, format=format, filters=filters, fingerprint=fingerprint)
+    job.file.name = f'exports/{job.token}.{format}'
+    job.save()
+    submit_on_commit('tickets.exports.run_export_job', job.pk)
+    return job, True
+
+
+def _write_export(job, chunk_size):
+    tickets = TicketFilterForm(job.filters).filter_queryset(Ticket.objects.all(), get_role(job.user))
+    # Id order, so a resumed job can carry on after its last checkpoint
+    tickets = tickets.order_by('id')
+    if not job.last_id:
+        job.total = tickets.count()
+        ExportJob.objects.filter(pk=job.pk).update(total=job.total)
+
+    path = default_storage.path(job.file.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    formatter = RowFormatter()
+    with open(path, 'ab') as out:
+        # Drop whatever a crashed run wrote after its last checkpoint
+        out.truncate(job.bytes_written)
+        if not job.bytes_written:
+            _append(out, job, encode_rows([], job.format, header=True), [])
+        while True:
+            chunk = list(tickets.filter(id__gt=job.last_id).values_list('id', *EXPORT_FIELDS)[:chunk_size])
+            if not chunk:
+                return
+            _append(out, job, encode_rows(formatter.rows([row[1:] for row in chunk]), job.format), chunk)
+
+
+def _append(out, job, data, chunk):
+    """Write a chunk to disk, then checkpoint the job past it"""
+    out.write(data)
+    out.flush()
+    os.fsync(out.fileno())
+    if chunk:
+        job.last_id = chunk[-1][0]
+    job.rows_written += len(chunk)
+    job.bytes_written += len(data)
+    ExportJob.objects.filter(pk=job.pk).update(
+        last_id=job.last_id, rows_written=job.rows_written, bytes_written=job.bytes_written,
+    )
+
+
+def run_export_job(job_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write a queued export, resuming after the last checkpointed chunk.
+
+    A job that died while running can be set back to pending and run
+    again; see the ``process_export_jobs`` command.
+    """
+    if not ExportJob.objects.filter(pk=job_id, status='pending').update(status='running'):
+        return  # Already taken by another runner
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    try:
+        _write_export(job, chunk_size)
+    except Exception as exc:
+        ExportJob.objects.filter(pk=job_id).update(status='failed', error=str(exc), finished_at=timezone.now())
+        raise
+    ExportJob.objects.filter(pk=job_id).update(status='done', finished_at=timezone.now())
+
+
+def purge_exports(now=None):
+    """Delete export jobs older than ``EXPORT_JOB_TTL`` and their files"""
+    cutoff = (now or timezone.now()) - timedelta(seconds=EXPORT_JOB_TTL)
+    expired = ExportJob.objects.filter(created_at__lt=cutoff).exclude(status='running')
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -2,12 +2,64 @@ from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
-from django.utils import timezone
 
 from .models import (
     Ticket, TicketComment, TicketAttachment, Department,
     Category, Priority, UserProfile, KnowledgeBase
 )
+from .permissions import get_role
+from .reference_data import get_reference_data
+from .search import get_search_backend
+from .stats import day_range_q
+
+
+class CachedChoiceIterator(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.get_objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.get_objects()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.get_objects())
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    Model choice field whose options come from the reference data cache.
+
+    ``source`` is the name of a ``ReferenceData`` attribute; ``limit`` an
+    optional predicate narrowing it. Rendering and validation both work on
+    the cached objects, so neither touches the database.
+    """
+    iterator = CachedChoiceIterator
+
+    def __init__(self, model, source, limit=None, **kwargs):
+        self.source = source
+        self.limit = limit
+        super().__init__(queryset=model.objects.none(), **kwargs)
+
+    def get_objects(self):
+        objects = getattr(get_reference_data(), self.source)
+        if self.limit is not None:
+            objects = [obj for obj in objects if self.limit(obj)]
+        return objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        key = self.to_field_name or 'pk'
+        for obj in self.get_objects():
+            if str(getattr(obj, key)) == str(value):
+                return obj
+        raise ValidationError(
+            self.error_messages['invalid_choice'],
+            code='invalid_choice',
+            params={'value': value},
+        )
 
 class LoginForm(AuthenticationForm):
     def __init__(self, *args, **kwargs):
@@ -19,6 +71,9 @@ class LoginForm(AuthenticationForm):
 
 
 class TicketCreateForm(forms.ModelForm):
+    department = CachedModelChoiceField(Department, 'departments', widget=forms.Select(attrs={'class': 'form-select'}))
+    category = CachedModelChoiceField(Category, 'categories', widget=forms.Select(attrs={'class': 'form-select'}))
+    priority = CachedModelChoiceField(Priority, 'priorities', widget=forms.Select(attrs={'class': 'form-select'}))
 
     class Meta:
         model = Ticket
@@ -39,24 +94,25 @@ class TicketCreateForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         department_id = None
+        current_category_id = None
 
         if self.is_bound and 'department' in self.data:
             try:
                 department_id = int(self.data.get('department'))
-                self.fields['category'].queryset = Category.objects.filter(
-                    department_id=department_id, is_active=True
-                ).order_by('name')
             except (ValueError, TypeError):
-                self.fields['category'].queryset = Category.objects.none()
+                pass
 
-        elif self.instance.pk and self.instance.department:
+        elif self.instance.pk and self.instance.department_id:
             department_id = self.instance.department_id
-            qs = Category.objects.filter(department_id=department_id, is_active=True)
-            if self.instance.category and self.instance.category not in qs:
-                qs = qs | Category.objects.filter(pk=self.instance.category.pk)
-            self.fields['category'].queryset = qs.order_by('name')
-        else:
-            self.fields['category'].queryset = Category.objects.none()
+            current_category_id = self.instance.category_id
+
+        # Active categories of the chosen department, plus the ticket's
+        # current one even if it has since been deactivated
+        self.fields['category'].source = 'categories'
+        self.fields['category'].limit = lambda category: (
+            department_id is not None and category.department_id == department_id and
+            (category.is_active or category.pk == current_category_id)
+        )
 
     def save(self, commit=True):
         ticket = super().save(commit=False)
@@ -69,6 +125,13 @@ class TicketCreateForm(forms.ModelForm):
 
 class TicketUpdateForm(forms.ModelForm):
     """Form for updating existing tickets"""
+    department = CachedModelChoiceField(Department, 'departments', widget=forms.Select(attrs={'class': 'form-select'}))
+    category = CachedModelChoiceField(Category, 'categories', widget=forms.Select(attrs={'class': 'form-select'}))
+    priority = CachedModelChoiceField(Priority, 'priorities', widget=forms.Select(attrs={'class': 'form-select'}))
+    assigned_to = CachedModelChoiceField(
+        User, 'agents', required=False, empty_label="Unassigned",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
 
     class Meta:
         model = Ticket
@@ -92,18 +155,11 @@ class TicketUpdateForm(forms.ModelForm):
 
         
 
-        # Filter assigned_to to only agents and supervisors
-        agent_users = User.objects.filter(
-            userprofile__is_agent=True
-        ).select_related('userprofile')
-        self.fields['assigned_to'].queryset = agent_users
-        self.fields['assigned_to'].empty_label = "Unassigned"
-
         # Filter categories based on department
-        if self.instance and self.instance.department:
-            self.fields['category'].queryset = Category.objects.filter(
-                department=self.instance.department, is_active=True
-            )
+        if self.instance and self.instance.department_id:
+            department_id = self.instance.department_id
+            self.fields['category'].source = 'active_categories'
+            self.fields['category'].limit = lambda category: category.department_id == department_id
 
 
 class TicketCommentForm(forms.ModelForm):
@@ -124,8 +180,7 @@ class TicketCommentForm(forms.ModelForm):
         
 
         # Only show internal option to agents/supervisors
-        if self.user and not (hasattr(self.user, 'userprofile') and
-                              (self.user.userprofile.is_agent or self.user.userprofile.is_supervisor)):
+        if self.user and not get_role(self.user).is_staff_member:
             self.fields.pop('is_internal')
 
     def save(self, commit=True):
@@ -183,26 +238,26 @@ class TicketFilterForm(forms.Form):
     STATUS_CHOICES = [('', 'All Statuses')] + Ticket.STATUS_CHOICES
 
     status = forms.ChoiceField(choices=STATUS_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
-    priority = forms.ModelChoiceField(
-        queryset=Priority.objects.all(),
+    priority = CachedModelChoiceField(
+        Priority, 'priorities',
         empty_label="All Priorities",
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
-    department = forms.ModelChoiceField(
-        queryset=Department.objects.filter(is_active=True),
+    department = CachedModelChoiceField(
+        Department, 'active_departments',
         empty_label="All Departments",
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
-    category = forms.ModelChoiceField(
-        queryset=Category.objects.filter(is_active=True),
+    category = CachedModelChoiceField(
+        Category, 'active_categories',
         empty_label="All Categories",
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
-    assigned_to = forms.ModelChoiceField(
-        queryset=User.objects.filter(userprofile__is_agent=True),
+    assigned_to = CachedModelChoiceField(
+        User, 'agents',
         empty_label="All Agents",
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -223,8 +278,40 @@ class TicketFilterForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def filter_queryset(self, queryset, role):
+        """
+        Tickets of ``queryset`` the role may see, narrowed by the valid
+        filters; newest first, or by relevance when searching.
+        """
+        queryset = role.filter_visible(queryset)
+        if not self.is_valid():
+            return queryset.order_by('-created_at')
+
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('priority'):
+            queryset = queryset.filter(priority=data['priority'])
+        if data.get('department'):
+            queryset = queryset.filter(department=data['department'])
+        if data.get('category'):
+            queryset = queryset.filter(category=data['category'])
+        if data.get('assigned_to'):
+            queryset = queryset.filter(assigned_to=data['assigned_to'])
+        if data.get('date_from') or data.get('date_to'):
+            queryset = queryset.filter(day_range_q(data.get('date_from'), data.get('date_to')))
+        if data.get('search'):
+            # Matches come back ranked by relevance
+            return get_search_backend().filter(
+                queryset, data['search'], include_internal=role.can_see_internal_notes()
+            )
+        return queryset.order_by('-created_at')
+
 
 class UserProfileForm(forms.ModelForm):
+    department = CachedModelChoiceField(
+        Department, 'departments', required=False, widget=forms.Select(attrs={'class': 'form-select'})
+    )
 
     first_name = forms.CharField(max_length=30, required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
     last_name = forms.CharField(max_length=30, required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
@@ -325,15 +412,15 @@ class BulkTicketActionForm(forms.Form):
     ]
 
     action = forms.ChoiceField(choices=ACTION_CHOICES, required=True, widget=forms.Select(attrs={'class': 'form-select'}))
-    assigned_to = forms.ModelChoiceField(
-        queryset=User.objects.filter(userprofile__is_agent=True),
+    assigned_to = CachedModelChoiceField(
+        User, 'agents',
         required=False,
         empty_label="Select Agent",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     status = forms.ChoiceField(choices=Ticket.STATUS_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
-    priority = forms.ModelChoiceField(
-        queryset=Priority.objects.all(),
+    priority = CachedModelChoiceField(
+        Priority, 'priorities',
         required=False,
         empty_label="Select Priority",
         widget=forms.Select(attrs={'class': 'form-select'})
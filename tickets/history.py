@@ -0,0 +1,199 @@
+import contextvars
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Ticket, TicketHistory
+from .reference_data import get_reference_data
+
+
+# Ticket attributes whose changes are written to TicketHistory
+HISTORY_FIELDS = [
+    'title', 'description', 'department_id', 'category_id', 'priority_id', 'assigned_to_id',
+    'status', 'due_date', 'resolution', 'tags', 'resolved_at', 'closed_at',
+]
+
+STATUS_LABELS = dict(Ticket.STATUS_CHOICES)
+
+# Rows stored per INSERT by the queued writer
+HISTORY_WRITE_BATCH_SIZE = getattr(settings, 'HISTORY_WRITE_BATCH_SIZE', 500)
+
+logger = logging.getLogger(__name__)
+
+# Function returning the user responsible for ticket changes made in the
+# current request or task. Not the user itself: asgiref compares context
+# values when crossing between threads and the event loop, which would load
+# a lazy ``request.user`` from async code.
+_actor = contextvars.ContextVar('ticket_history_actor', default=None)
+
+
+@contextmanager
+def changed_by(user):
+    """
+    Attribute ticket changes saved inside the block to ``user``, or to the
+    user a function returns, looked up when the first change is saved.
+    """
+    token = _actor.set(user if callable(user) else lambda: user)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def current_actor_id():
+    """Id of the user changing tickets right now; None for system changes"""
+    actor = _actor.get()
+    user = actor() if actor else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def _names(objects):
+    return {obj.pk: str(obj) for obj in objects}
+
+
+def _user_name(user_id, data):
+    for agent in data.agents:
+        if agent.pk == user_id:
+            return agent.get_full_name() or agent.username
+    user = User.objects.filter(pk=user_id).first()
+    return (user.get_full_name() or user.username) if user else f"User #{user_id}"
+
+
+def display_value(field, value):
+    """Human readable form of a ticket value, as stored in the history"""
+    if value is None or value == '':
+        return ''
+    if field == 'status':
+        return STATUS_LABELS.get(value, value)
+    if field == 'assigned_to_id':
+        return _user_name(value, get_reference_data())
+    if field in ('department_id', 'category_id', 'priority_id'):
+        data = get_reference_data()
+        objects = {
+            'department_id': data.departments,
+            'category_id': data.categories,
+            'priority_id': data.priorities,
+        }[field]
+        return _names(objects).get(value, f"#{value}")
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+    return str(value)
+
+
+def history_entries(ticket_id, before, after, user_id=None, action='Updated'):
+    """
+    Unsaved TicketHistory rows, one per field that differs between the
+    ``before`` and ``after`` value dicts.
+    """
+    entries = []
+    for field in HISTORY_FIELDS:
+        if field not in before or field not in after or before[field] == after[field]:
+            continue
+        entries.append(TicketHistory(
+            ticket_id=ticket_id,
+            user_id=user_id,
+            action=action,
+            field_changed=Ticket._meta.get_field(field).name,
+            old_value=display_value(field, before[field]),
+            new_value=display_value(field, after[field]),
+        ))
+    return entries
+
+
+class SyncHistoryWriter:
+    """Stores history rows in the caller's transaction"""
+
+    def write(self, entries):
+        TicketHistory.objects.bulk_create(entries)
+
+    def flush(self):
+        pass
+
+
+class QueuedHistoryWriter:
+    """
+    Hands history rows to a daemon thread once the caller's transaction
+    commits, so requests don't wait for the audit INSERTs.
+
+    Rows still queued when the process dies are lost; use the synchronous
+    writer where every change must be on record.
+    """
+
+    def __init__(self, batch_size=HISTORY_WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def write(self, entries):
+        transaction.on_commit(lambda: self._put(entries))
+
+    def _put(self, entries):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, daemon=True)
+                self._thread.start()
+        self._queue.put(entries)
+
+    def _drain(self):
+        while True:
+            batches = [self._queue.get()]
+            rows = list(batches[0])
+            # Coalesce whatever else is waiting into the same INSERTs
+            while len(rows) < self.batch_size:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                rows.extend(batches[-1])
+            close_old_connections()
+            try:
+                TicketHistory.objects.bulk_create(rows, batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Could not store %d ticket history rows", len(rows))
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every committed row is stored"""
+        self._queue.join()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_history_writer():
+    """Writer configured by ``TICKET_HISTORY_WRITER``"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                path = getattr(settings, 'TICKET_HISTORY_WRITER', 'tickets.history.SyncHistoryWriter')
+                _writer = import_string(path)()
+    return _writer
+
+
+def write_entries(entries):
+    """Store history rows with a single INSERT through the configured writer"""
+    if entries:
+        get_history_writer().write(entries)
+    return len(entries)
+
+
+def record_ticket_changes(ticket, previous):
+    """Write the field changes of a saved ticket; ``previous`` is None for new ones"""
+    if previous is None:
+        return 0
+    after = {field: getattr(ticket, field) for field in HISTORY_FIELDS}
+    return write_entries(history_entries(ticket.pk, previous, after, current_actor_id()))
@@ -0,0 +1,77 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedJobRunner:
+    """
+    Leaves jobs to a worker process; the default.
+
+    Every job is already stored as a pending row, so there is nothing to
+    hand over: the ``process_export_jobs`` and ``process_bulk_actions``
+    commands, run from cron or a process supervisor, pick them up. Web
+    workers never run them, and a job survives their restarts.
+    """
+
+    def submit(self, path, *args):
+        pass
+
+
+class ThreadJobRunner:
+    """
+    Runs jobs on a daemon thread of the current process.
+
+    For development on a single server only: the web worker does the work,
+    and a job interrupted when it restarts stays running until it is
+    resumed with ``--resume``.
+    """
+
+    def submit(self, path, *args):
+        thread = threading.Thread(target=self._run, args=(path, args), daemon=True)
+        thread.start()
+
+    def _run(self, path, args):
+        close_old_connections()
+        try:
+            import_string(path)(*args)
+        except Exception:
+            logger.exception("Background job %s%r failed", path, args)
+        finally:
+            connections.close_all()
+
+
+class SyncJobRunner:
+    """Runs jobs inline; for tests and management commands"""
+
+    def submit(self, path, *args):
+        import_string(path)(*args)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Runner configured by ``TICKET_JOB_RUNNER``"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                path = getattr(settings, 'TICKET_JOB_RUNNER', 'tickets.jobs.QueuedJobRunner')
+                _runner = import_string(path)()
+    return _runner
+
+
+def submit_on_commit(path, *args):
+    """
+    Run the function at dotted ``path`` in the background once the
+    surrounding transaction commits. Arguments should be plain values (ids),
+    so runners backed by an external queue can serialize them.
+    """
+    transaction.on_commit(lambda: get_job_runner().submit(path, *args))
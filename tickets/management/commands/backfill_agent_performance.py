@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tickets.performance import backfill_performance
+
+
+class Command(BaseCommand):
+    help = "Build the daily agent performance rows behind the scorecards from ticket history"
+
+    def handle(self, *args, **options):
+        rows = backfill_performance()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} agent performance rows."))
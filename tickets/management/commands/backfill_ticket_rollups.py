@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = "Build the daily ticket rollups used by the reports from ticket history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', metavar='YYYY-MM-DD',
+            help="Only rebuild rollup days on or after this date",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+
+        rows = backfill_rollups(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} daily rollup rows."))
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tickets.models import Ticket, UserProfile
+from tickets.stats import day_range_q, overdue_q
+
+
+# Indexes added for the role-scoped queries below
+QUERY_INDEXES = [
+    'ticket_dept_status_idx',
+    'ticket_agent_status_idx',
+    'ticket_submitter_idx',
+    'ticket_status_due_idx',
+]
+
+
+class Command(BaseCommand):
+    help = "Show query plans and timings for the hot ticket queries, before and after the query indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=20,
+            help="Times to run each query when measuring (default 20)",
+        )
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help="Width of the report date range in days (default 30)",
+        )
+
+    def handle(self, *args, **options):
+        self.runs = options['runs']
+        today = timezone.localdate()
+        date_from = today - timedelta(days=options['days'])
+
+        agent = UserProfile.objects.filter(is_agent=True).select_related('user').first()
+        department_id = agent.department_id if agent else None
+        agent_id = agent.user_id if agent else None
+        submitter_id = Ticket.objects.values_list('submitter_id', flat=True).first()
+
+        def queries(legacy):
+            if legacy:
+                in_range = Q(created_at__date__range=[date_from, today])
+            else:
+                in_range = day_range_q(date_from, today)
+            return [
+                ('agent ticket list', Ticket.objects.filter(
+                    Q(assigned_to_id=agent_id) | Q(department_id=department_id)
+                ).order_by('-created_at')[:20]),
+                ('submitter ticket list', Ticket.objects.filter(
+                    submitter_id=submitter_id
+                ).order_by('-created_at')[:20]),
+                ('department report range', Ticket.objects.filter(
+                    in_range, department_id=department_id
+                ).values('status').order_by()),
+                ('agent active queue', Ticket.objects.filter(
+                    assigned_to_id=agent_id, status__in=Ticket.ACTIVE_STATUSES
+                ).values('id').order_by()),
+                ('overdue count', Ticket.objects.filter(overdue_q()).values('id').order_by()),
+            ]
+
+        self.stdout.write(f"{Ticket.objects.count()} tickets on {connection.vendor}\n")
+
+        if connection.features.can_rollback_ddl:
+            # Drop the indexes inside a transaction that is rolled back, so the
+            # baseline can be measured without touching the schema
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in QUERY_INDEXES:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+                self.stdout.write(self.style.MIGRATE_HEADING("Before (no query indexes, __date filters)"))
+                self.report(queries(legacy=True))
+                transaction.set_rollback(True)
+        else:
+            self.stdout.write(self.style.WARNING(
+                "This database cannot roll back DDL; showing current plans only."
+            ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("After"))
+        self.report(queries(legacy=False))
+
+    def report(self, queries):
+        for label, queryset in queries:
+            start = time.perf_counter()
+            for _ in range(self.runs):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / self.runs * 1000
+
+            self.stdout.write(self.style.SQL_KEYWORD(f"{label}: {elapsed:.2f} ms"))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
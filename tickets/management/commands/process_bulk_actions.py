@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from tickets.bulk_actions import run_job
+from tickets.models import BulkActionJob
+
+
+class Command(BaseCommand):
+    help = "Run bulk ticket actions waiting for a worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Also restart jobs left running by a worker that died; "
+                 "they carry on after their last committed chunk",
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            BulkActionJob.objects.filter(status='running').update(status='pending')
+
+        pending = list(BulkActionJob.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True))
+        for job_id in pending:
+            try:
+                run_job(job_id)
+            except Exception as exc:
+                # Recorded on the job; carry on with the others
+                self.stderr.write(f"Bulk action {job_id} failed: {exc}")
+                continue
+            job = BulkActionJob.objects.get(pk=job_id)
+            self.stdout.write(f"Bulk action {job_id}: {job.processed} tickets ({job.status})")
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {len(pending)} bulk actions."))
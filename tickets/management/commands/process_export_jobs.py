@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from tickets.exports import purge_exports, run_export_job
+from tickets.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Run export jobs waiting for a worker and delete expired export files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Also restart jobs left running by a worker that died; "
+                 "they carry on from their last checkpoint",
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            ExportJob.objects.filter(status='running').update(status='pending')
+
+        pending = list(ExportJob.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True))
+        for job_id in pending:
+            try:
+                run_export_job(job_id)
+            except Exception as exc:
+                # Recorded on the job; carry on with the others
+                self.stderr.write(f"Export {job_id} failed: {exc}")
+                continue
+            job = ExportJob.objects.get(pk=job_id)
+            self.stdout.write(f"Export {job_id}: {job.rows_written} tickets ({job.status})")
+
+        purged = purge_exports()
+        self.stdout.write(self.style.SUCCESS(f"Ran {len(pending)} export jobs, purged {purged} expired exports."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.counters import rebuild_counters, sweep_overdue, verify_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ticket counter table from scratch, or verify it against the tickets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare the stored counters with a fresh count; exit non-zero on drift",
+        )
+        parser.add_argument(
+            '--sweep', action='store_true',
+            help="Only move tickets that fell due since the last sweep into the overdue buckets",
+        )
+
+    def handle(self, *args, **options):
+        if options['sweep']:
+            moved = sweep_overdue()
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} newly overdue tickets."))
+            return
+
+        if options['verify']:
+            mismatches = verify_counters()
+            for key, (stored, expected) in sorted(mismatches.items(), key=str):
+                self.stdout.write(f"{key}: stored {stored}, expected {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} counter buckets are out of date.")
+            self.stdout.write(self.style.SUCCESS("Ticket counters are up to date."))
+            return
+
+        counters = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(counters)} counter buckets covering {sum(counters.values())} tickets."
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.models import Ticket
+from tickets.sla import recompute_deadlines
+
+
+class Command(BaseCommand):
+    help = "Re-derive SLA response/resolution deadlines of open tickets, e.g. after editing an SLA"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, help="Only tickets of this department id")
+        parser.add_argument('--priority', type=int, help="Only tickets of this priority id")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report open tickets whose deadlines are out of date",
+        )
+
+    def handle(self, *args, **options):
+        tickets = Ticket.objects.all()
+        if options['department']:
+            tickets = tickets.filter(department_id=options['department'])
+        if options['priority']:
+            tickets = tickets.filter(priority_id=options['priority'])
+
+        checked, changed = recompute_deadlines(
+            tickets, chunk_size=options['chunk_size'], dry_run=options['verify']
+        )
+        if options['verify']:
+            if changed:
+                raise CommandError(f"{changed} of {checked} open tickets have stale deadlines.")
+            self.stdout.write(self.style.SUCCESS("Ticket deadlines are up to date."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Updated deadlines of {changed} of {checked} open tickets."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.activity import reconcile_activity, stale_activity
+
+
+class Command(BaseCommand):
+    help = "Recompute ticket comment/attachment counts and last-activity times"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report tickets whose activity columns are out of date",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            stale = stale_activity()
+            if stale:
+                raise CommandError(f"{len(stale)} tickets have stale activity columns.")
+            self.stdout.write(self.style.SUCCESS("Ticket activity columns are up to date."))
+            return
+
+        updated = reconcile_activity()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled activity for {updated} tickets."))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tickets.breaches import BREACH_SCAN_BATCH_SIZE, BREACH_SCAN_INTERVAL, scan_breaches
+
+
+class Command(BaseCommand):
+    help = "Stamp tickets that went past their due date and record the SLA breaches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep scanning every --interval seconds until interrupted",
+        )
+        parser.add_argument('--interval', type=int, default=BREACH_SCAN_INTERVAL)
+        parser.add_argument('--batch-size', type=int, default=BREACH_SCAN_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            breached = scan_breaches(batch_size=options['batch_size'])
+            if breached or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Recorded {breached} SLA breaches."))
+            if not options['loop']:
+                return
+            # Long-lived process: don't hold on to a connection the server closed
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.models import Department
+from tickets.reporting import default_window, get_report
+from tickets.stats import ALL_DEPARTMENTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the default report window for all tickets and for every "
+        "department; run shortly after midnight, when yesterday's entries "
+        "stop matching the new default range. Needs a cache shared with the "
+        "web workers, such as Redis or Memcached"
+    )
+
+    def handle(self, *args, **options):
+        # Entries warmed in this process's memory would never reach a worker
+        backend = caches['default']
+        if isinstance(backend, (LocMemCache, DummyCache)):
+            raise CommandError(
+                f"The default cache ({type(backend).__name__}) is not shared with the web workers; "
+                "configure a shared backend such as Redis or Memcached in CACHES first."
+            )
+
+        date_from, date_to = default_window()
+        department_ids = [ALL_DEPARTMENTS, *Department.objects.filter(is_active=True).values_list('pk', flat=True)]
+        for department_id in department_ids:
+            report, timings = get_report(date_from, date_to, department_id, refresh=True)
+            self.stdout.write(
+                f"{'All departments' if department_id == ALL_DEPARTMENTS else f'Department {department_id}'}: "
+                f"{report['total_tickets']} tickets ({timings})"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {len(department_ids)} reports for {date_from} to {date_to}."
+        ))
@@ -0,0 +1,27 @@
+from django.utils.functional import SimpleLazyObject
+
+from .history import changed_by
+from .permissions import get_role
+
+
+class RoleMiddleware:
+    """Attach the user's cached ``Role`` as ``request.role``"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Lazy, so requests that never check permissions never load it
+        request.role = SimpleLazyObject(lambda: get_role(request.user))
+        return self.get_response(request)
+
+
+class HistoryActorMiddleware:
+    """Attribute ticket changes saved during the request to its user"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with changed_by(lambda: request.user):
+            return self.get_response(request)
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_counters(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketCounter = apps.get_model('tickets', 'TicketCounter')
+    TicketCounterState = apps.get_model('tickets', 'TicketCounterState')
+
+    now = django.utils.timezone.now()
+    overdue = Q(status__in=['open', 'in_progress', 'pending'], due_date__lt=now)
+    rows = Ticket.objects.order_by().values(
+        'department_id', 'assigned_to_id', 'priority_id', 'status'
+    ).annotate(total=Count('id'), overdue=Count('id', filter=overdue))
+
+    counters = []
+    for row in rows:
+        for is_overdue, count in ((True, row['overdue']), (False, row['total'] - row['overdue'])):
+            if count:
+                counters.append(TicketCounter(
+                    department_id=row['department_id'],
+                    assigned_to_id=row['assigned_to_id'],
+                    priority_id=row['priority_id'],
+                    status=row['status'],
+                    is_overdue=is_overdue,
+                    ticket_count=count,
+                ))
+    TicketCounter.objects.bulk_create(counters)
+    TicketCounterState.objects.create(swept_until=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_remove_priority_color'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCounterState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('swept_until', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TicketCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('in_progress', 'In Progress'), ('pending', 'Pending'), ('resolved', 'Resolved'), ('closed', 'Closed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('is_overdue', models.BooleanField(default=False)),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.department')),
+                ('priority', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.priority')),
+            ],
+            options={
+                'unique_together': {('department', 'assigned_to', 'priority', 'status', 'is_overdue')},
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
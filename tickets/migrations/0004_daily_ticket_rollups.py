@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:18
+
+import datetime
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    DailyTicketRollup = apps.get_model('tickets', 'DailyTicketRollup')
+
+    dimensions = ['department_id', 'priority_id', 'status', 'assigned_to_id']
+    resolved = Q(status__in=['resolved', 'closed'], resolved_at__isnull=False)
+    resolution_time = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())
+    sources = [
+        ('created_at', {
+            'created_count': Count('id'),
+            'resolution_count': Count('id', filter=resolved),
+            'resolution_time': Sum(resolution_time, filter=resolved),
+        }),
+        ('resolved_at', {'resolved_count': Count('id')}),
+        ('closed_at', {'closed_count': Count('id')}),
+    ]
+
+    rows = defaultdict(dict)
+    for date_field, aggregates in sources:
+        day = TruncDate(date_field, tzinfo=django.utils.timezone.get_current_timezone())
+        grouped = Ticket.objects.filter(**{f'{date_field}__isnull': False}).order_by().annotate(
+            rollup_day=day
+        ).values('rollup_day', *dimensions).annotate(**aggregates)
+        for row in grouped:
+            key = (row['rollup_day'],) + tuple(row[field] for field in dimensions)
+            rows[key].update({name: row[name] for name in aggregates})
+
+    DailyTicketRollup.objects.bulk_create([
+        DailyTicketRollup(
+            day=key[0],
+            **dict(zip(dimensions, key[1:])),
+            created_count=values.get('created_count', 0),
+            resolved_count=values.get('resolved_count', 0),
+            closed_count=values.get('closed_count', 0),
+            resolution_count=values.get('resolution_count', 0),
+            resolution_time=values.get('resolution_time') or datetime.timedelta(0),
+        )
+        for key, values in rows.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_ticket_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTicketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('in_progress', 'In Progress'), ('pending', 'Pending'), ('resolved', 'Resolved'), ('closed', 'Closed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_count', models.IntegerField(default=0, help_text='Tickets created on this day')),
+                ('resolved_count', models.IntegerField(default=0, help_text='Tickets resolved on this day')),
+                ('closed_count', models.IntegerField(default=0, help_text='Tickets closed on this day')),
+                ('resolution_count', models.IntegerField(default=0, help_text='Tickets created on this day with a resolution time')),
+                ('resolution_time', models.DurationField(default=datetime.timedelta(0))),
+                ('assigned_to', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.department')),
+                ('priority', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.priority')),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('day', 'department', 'priority', 'status', 'assigned_to')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
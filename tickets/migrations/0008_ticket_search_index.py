@@ -0,0 +1,100 @@
+from django.db import migrations
+
+
+def _comments(ticket_column, internal):
+    return (
+        "(SELECT coalesce(group_concat(comment, ' '), '') FROM tickets_ticketcomment "
+        f"WHERE ticket_id = {ticket_column} AND is_internal = {internal})"
+    )
+
+
+def _refresh_comments(ticket_column):
+    return (
+        f"UPDATE tickets_ticket_fts SET comments = {_comments(ticket_column, 0)}, "
+        f"internal_notes = {_comments(ticket_column, 1)} WHERE rowid = {ticket_column};"
+    )
+
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE tickets_ticket_fts USING fts5(
+        ticket_number, title, tags, description, resolution, comments, internal_notes,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_insert AFTER INSERT ON tickets_ticket BEGIN
+        INSERT INTO tickets_ticket_fts (rowid, ticket_number, title, tags, description, resolution, comments, internal_notes)
+        VALUES (new.id, new.ticket_number, new.title, new.tags, new.description, new.resolution, '', '');
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_update
+    AFTER UPDATE OF ticket_number, title, tags, description, resolution ON tickets_ticket BEGIN
+        UPDATE tickets_ticket_fts SET
+            ticket_number = new.ticket_number, title = new.title, tags = new.tags,
+            description = new.description, resolution = new.resolution
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_delete AFTER DELETE ON tickets_ticket BEGIN
+        DELETE FROM tickets_ticket_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tickets_ticketcomment_fts_insert AFTER INSERT ON tickets_ticketcomment BEGIN
+        {_refresh_comments('new.ticket_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER tickets_ticketcomment_fts_update
+    AFTER UPDATE OF comment, is_internal, ticket_id ON tickets_ticketcomment BEGIN
+        {_refresh_comments('old.ticket_id')}
+        {_refresh_comments('new.ticket_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER tickets_ticketcomment_fts_delete AFTER DELETE ON tickets_ticketcomment BEGIN
+        {_refresh_comments('old.ticket_id')}
+    END
+    """,
+    f"""
+    INSERT INTO tickets_ticket_fts (rowid, ticket_number, title, tags, description, resolution, comments, internal_notes)
+    SELECT id, ticket_number, title, tags, description, resolution, {_comments('id', 0)}, {_comments('id', 1)}
+    FROM tickets_ticket
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS tickets_ticketcomment_fts_delete",
+    "DROP TRIGGER IF EXISTS tickets_ticketcomment_fts_update",
+    "DROP TRIGGER IF EXISTS tickets_ticketcomment_fts_insert",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_delete",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_update",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_insert",
+    "DROP TABLE IF EXISTS tickets_ticket_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # The full-text index is SQLite specific; other databases fall back
+        # to the unindexed search backend
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:29
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def fill_activity(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketComment = apps.get_model('tickets', 'TicketComment')
+    TicketAttachment = apps.get_model('tickets', 'TicketAttachment')
+
+    def per_ticket(model, aggregate, **filters):
+        return Subquery(
+            model.objects.filter(ticket=OuterRef('pk'), **filters)
+            .order_by().values('ticket').annotate(value=aggregate).values('value')
+        )
+
+    Ticket.objects.update(
+        comment_count=Coalesce(per_ticket(TicketComment, Count('pk')), 0),
+        attachment_count=Coalesce(per_ticket(TicketAttachment, Count('pk')), 0),
+        last_activity_at=Greatest(
+            Coalesce(per_ticket(TicketComment, Max('created_at')), per_ticket(TicketAttachment, Max('uploaded_at'))),
+            Coalesce(per_ticket(TicketAttachment, Max('uploaded_at')), per_ticket(TicketComment, Max('created_at'))),
+        ),
+        last_public_comment_at=per_ticket(TicketComment, Max('created_at'), is_internal=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_ticket_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='last_public_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
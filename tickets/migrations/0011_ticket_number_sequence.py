@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_reference_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=8, unique=True)),
+                ('next_value', models.PositiveBigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='ticket_prefix',
+            field=models.CharField(blank=True, help_text='Ticket number prefix for this department; blank uses the global prefix', max_length=8),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:41
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_deadlines(apps, schema_editor):
+    # Existing due dates were the priority's response time, which is what
+    # the SLA engine falls back to; recompute_ticket_deadlines applies SLAs
+    Ticket = apps.get_model('tickets', 'Ticket')
+    Ticket.objects.update(response_due_at=F('due_date'), resolution_due_at=F('due_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0011_ticket_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='resolution_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(fill_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def fill_breaches(apps, schema_editor):
+    # Finished tickets that ran late; the scanner stamps active ones
+    Ticket = apps.get_model('tickets', 'Ticket')
+    Ticket.objects.filter(
+        Q(resolved_at__gt=F('due_date')) | Q(resolved_at__isnull=True, closed_at__gt=F('due_date')),
+    ).exclude(status__in=['open', 'in_progress', 'pending']).update(breached_at=F('due_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0012_ticket_sla_deadlines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='breached_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tickethistory',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'breached_at', 'due_date'], name='ticket_breach_scan_idx'),
+        ),
+        migrations.RunPython(fill_breaches, migrations.RunPython.noop),
+    ]
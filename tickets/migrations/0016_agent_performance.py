@@ -0,0 +1,73 @@
+# Generated by Django 5.2.4 on 2026-10-17 08:16
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_first_responses(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketComment = apps.get_model('tickets', 'TicketComment')
+
+    first = TicketComment.objects.filter(
+        ticket=OuterRef('pk'), is_internal=False,
+    ).exclude(author=OuterRef('submitter')).order_by('created_at', 'pk')
+
+    Ticket.objects.update(
+        first_response_at=Subquery(first.values('created_at')[:1]),
+        first_responder=Subquery(first.values('author')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0015_ticket_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='first_responder',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='first_responses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='first_response_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='AgentDailyPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('handled_count', models.IntegerField(default=0, help_text='Tickets the agent first responded to on this day')),
+                ('resolved_count', models.IntegerField(default=0, help_text='Tickets assigned to the agent resolved on this day')),
+                ('first_response_time', models.DurationField(default=datetime.timedelta(0))),
+                ('resolution_time', models.DurationField(default=datetime.timedelta(0))),
+                ('agent', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('day', 'agent')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AgentDurationBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('first_response', 'First response'), ('resolution', 'Resolution')], max_length=20)),
+                ('bucket', models.SmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('agent', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('day', 'agent', 'metric', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_first_responses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 08:35
+
+import django.db.models.deletion
+import tickets.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0017_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSearchEntry',
+            fields=[
+                ('ticket', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='tickets.ticket')),
+                ('document', tickets.models.SearchDocumentField(db_column='tickets_ticket_fts')),
+            ],
+            options={
+                'db_table': 'tickets_ticket_fts',
+                'managed': False,
+            },
+        ),
+    ]
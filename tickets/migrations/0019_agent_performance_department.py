@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_performance(apps, schema_editor):
+    # Rows can't be split by department after the fact, nor merged back on
+    # the way down; the backfill_agent_performance command rebuilds them
+    apps.get_model('tickets', 'AgentDailyPerformance').objects.all().delete()
+    apps.get_model('tickets', 'AgentDurationBucket').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0018_ticket_search_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_performance, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='agentdailyperformance',
+            name='department',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.department'),
+        ),
+        migrations.AddField(
+            model_name='agentdurationbucket',
+            name='department',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tickets.department'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='agentdailyperformance',
+            unique_together={('day', 'agent', 'department')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='agentdurationbucket',
+            unique_together={('day', 'agent', 'department', 'metric', 'bucket')},
+        ),
+        migrations.RunPython(migrations.RunPython.noop, clear_performance),
+    ]
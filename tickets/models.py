@@ -1,4 +1,6 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
@@ -9,6 +11,10 @@ class Department(models.Model):
     description = models.TextField(blank=True)
     email = models.EmailField(blank=True)
     is_active = models.BooleanField(default=True)
+    ticket_prefix = models.CharField(
+        max_length=8, blank=True,
+        help_text="Ticket number prefix for this department; blank uses the global prefix"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -77,6 +83,9 @@ class Ticket(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses that still count against a ticket's due date
+    ACTIVE_STATUSES = ['open', 'in_progress', 'pending']
+    
     # Basic ticket information
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -92,10 +101,17 @@ class Ticket(models.Model):
     # Status and tracking
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamps (created_at is set on instantiation rather than by
+    # auto_now_add so the SLA deadlines can be derived from it before saving)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateTimeField(null=True, blank=True)
+    # SLA deadlines, set by tickets.sla when the ticket is opened or moves
+    # to another department or priority
+    response_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    resolution_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # When the current due date was missed; stamped by tickets.breaches
+    breached_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
     closed_at = models.DateTimeField(null=True, blank=True)
     
@@ -103,31 +119,57 @@ class Ticket(models.Model):
     tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
     resolution = models.TextField(blank=True)
     
+    # Activity summary, maintained by tickets.activity as comments and
+    # attachments come and go
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    attachment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_public_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # First public comment by someone other than the submitter; stamped by
+    # tickets.activity
+    first_response_at = models.DateTimeField(null=True, blank=True, editable=False)
+    first_responder = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='first_responses'
+    )
+    
     def save(self, *args, **kwargs):
         # Generate ticket number if not exists
         if not self.ticket_number:
             self.ticket_number = self.generate_ticket_number()
         
-        # Set due date based on priority
-        if not self.due_date and self.priority:
-            self.due_date = timezone.now() + timezone.timedelta(hours=self.priority.response_time)
+        self.set_status_timestamps()
+        
+        from .breaches import check_breach, record_breaches, BREACH_FIELDS
+        from .history import record_ticket_changes, HISTORY_FIELDS
+        from .sla import get_sla_engine
+        from .tracking import record_ticket_save, TRACKED_FIELDS
         
-        # Set resolved/closed timestamps
+        with transaction.atomic():
+            # Saved values, read once for the counters, SLA and history
+            previous = None
+            if self.pk:
+                fields = dict.fromkeys([*TRACKED_FIELDS, *HISTORY_FIELDS])
+                previous = Ticket.objects.filter(pk=self.pk).values(*fields).first()
+            # Response/resolution deadlines and the due date they drive
+            get_sla_engine().apply(self, previous)
+            breached = check_breach(self)
+            super().save(*args, **kwargs)
+            if breached:
+                record_breaches([{field: getattr(self, field) for field in BREACH_FIELDS}])
+            record_ticket_changes(self, previous)
+            record_ticket_save(previous, self)
+    
+    def set_status_timestamps(self, now=None):
+        """Set resolved/closed timestamps"""
         if self.status == 'resolved' and not self.resolved_at:
-            self.resolved_at = timezone.now()
+            self.resolved_at = now or timezone.now()
         elif self.status == 'closed' and not self.closed_at:
-            self.closed_at = timezone.now()
-        
-        super().save(*args, **kwargs)
+            self.closed_at = now or timezone.now()
     
     def generate_ticket_number(self):
-        from django.utils.crypto import get_random_string
-        import string
+        from .numbering import next_ticket_number
         
-        while True:
-            ticket_num = f"TK{get_random_string(8, string.digits)}"
-            if not Ticket.objects.filter(ticket_number=ticket_num).exists():
-                return ticket_num
+        return next_ticket_number(self.department_id)
     
     def get_absolute_url(self):
         return reverse('ticket_detail', kwargs={'pk': self.pk})
@@ -147,6 +189,259 @@ class Ticket(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the ticket list seeks on this pair
+            models.Index(fields=['-created_at', '-id'], name='ticket_created_id_idx'),
+            # Role-scoped lists, dashboards and reports
+            models.Index(fields=['department', 'status', 'created_at'], name='ticket_dept_status_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='ticket_agent_status_idx'),
+            models.Index(fields=['submitter', 'created_at'], name='ticket_submitter_idx'),
+            # Overdue checks probe each active status for a due_date range
+            models.Index(fields=['status', 'due_date'], name='ticket_status_due_idx'),
+            # The breach scanner seeks unstamped active tickets past due
+            models.Index(fields=['status', 'breached_at', 'due_date'], name='ticket_breach_scan_idx'),
+        ]
+
+
+class FullTextMatch(models.Lookup):
+    """``document MATCH query`` against an FTS5 table"""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class SearchDocumentField(models.TextField):
+    """An FTS5 table's hidden column named after the table, which stands for the whole row"""
+
+
+SearchDocumentField.register_lookup(FullTextMatch)
+
+
+class TicketSearchEntry(models.Model):
+    """
+    Row of the ``tickets_ticket_fts`` FTS5 table, created and kept in sync
+    by the search index migration and triggers (see tickets.search).
+    
+    Mapped so searches join the index like any relation.
+    """
+    ticket = models.OneToOneField(
+        Ticket, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry'
+    )
+    document = SearchDocumentField(db_column='tickets_ticket_fts')
+    
+    class Meta:
+        managed = False
+        db_table = 'tickets_ticket_fts'
+
+
+class TicketCounter(models.Model):
+    """Denormalized ticket counts per department/agent/priority/status bucket"""
+    department = models.ForeignKey(
+        Department, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    assigned_to = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+'
+    )
+    priority = models.ForeignKey(
+        Priority, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    is_overdue = models.BooleanField(default=False)
+    ticket_count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.department_id}/{self.assigned_to_id}/{self.status}: {self.ticket_count}"
+    
+    class Meta:
+        unique_together = ['department', 'assigned_to', 'priority', 'status', 'is_overdue']
+
+
+class TicketCounterState(models.Model):
+    """Watermark up to which past-due tickets have been moved to the overdue bucket"""
+    swept_until = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Counters swept until {self.swept_until}"
+
+
+class TicketSequence(models.Model):
+    """Next unissued ticket number for each ticket number prefix"""
+    prefix = models.CharField(max_length=8, unique=True)
+    next_value = models.PositiveBigIntegerField()
+    
+    def __str__(self):
+        return f"{self.prefix or '(no prefix)'}: next {self.next_value}"
+
+
+class ReferenceDataVersion(models.Model):
+    """Stamp bumped whenever departments, categories, priorities or agents change"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Reference data version {self.version}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version stamp of a cache scope, bumped when the data behind it changes.
+
+    Kept in the database rather than the cache so a bump made by one worker
+    is seen by all of them, whatever cache backend is configured.
+    """
+    scope = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.scope} version {self.version}"
+
+
+class DailyTicketRollup(models.Model):
+    """Per-day ticket totals by department/priority/status/agent for the reports"""
+    day = models.DateField()
+    department = models.ForeignKey(
+        Department, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    priority = models.ForeignKey(
+        Priority, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    assigned_to = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+'
+    )
+    created_count = models.IntegerField(default=0, help_text="Tickets created on this day")
+    resolved_count = models.IntegerField(default=0, help_text="Tickets resolved on this day")
+    closed_count = models.IntegerField(default=0, help_text="Tickets closed on this day")
+    resolution_count = models.IntegerField(default=0, help_text="Tickets created on this day with a resolution time")
+    resolution_time = models.DurationField(default=timezone.timedelta(0))
+    
+    def __str__(self):
+        return f"{self.day} {self.department_id}/{self.status}: {self.created_count}"
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'department', 'priority', 'status', 'assigned_to']
+
+
+class TicketEvent(models.Model):
+    """Outbox used by ``DatabaseBroker`` to relay live events between workers"""
+    channel = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.channel} at {self.created_at}"
+
+
+class AgentDailyPerformance(models.Model):
+    """Per-day work of each agent on each department's tickets, for the agent scorecards"""
+    day = models.DateField()
+    agent = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    department = models.ForeignKey(
+        Department, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    handled_count = models.IntegerField(default=0, help_text="Tickets the agent first responded to on this day")
+    resolved_count = models.IntegerField(default=0, help_text="Tickets assigned to the agent resolved on this day")
+    first_response_time = models.DurationField(default=timezone.timedelta(0))
+    resolution_time = models.DurationField(default=timezone.timedelta(0))
+    
+    def __str__(self):
+        return f"{self.day} agent {self.agent_id}: {self.handled_count}/{self.resolved_count}"
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = ['day', 'agent', 'department']
+
+
+class AgentDurationBucket(models.Model):
+    """
+    Histogram of an agent's first-response or resolution times per day.
+    
+    Medians can't be added up like totals; counts per duration bucket can,
+    and give the median of any range of days.
+    """
+    METRIC_CHOICES = [
+        ('first_response', 'First response'),
+        ('resolution', 'Resolution'),
+    ]
+    
+    day = models.DateField()
+    agent = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    department = models.ForeignKey(
+        Department, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    bucket = models.SmallIntegerField()
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day} agent {self.agent_id} {self.metric}[{self.bucket}]: {self.count}"
+    
+    class Meta:
+        unique_together = ['day', 'agent', 'department', 'metric', 'bucket']
+
+
+class BulkActionJob(models.Model):
+    """A bulk ticket action too large to run inside the request"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bulk_action_jobs')
+    action = models.CharField(max_length=20)
+    values = models.JSONField(default=dict, help_text="Action parameters, e.g. the new status")
+    ticket_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    processed = models.PositiveIntegerField(default=0, help_text="Selected tickets handled so far")
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.action} on {len(self.ticket_ids)} tickets ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ExportJob(models.Model):
+    """A ticket export written to a file in the background"""
+    STATUS_CHOICES = BulkActionJob.STATUS_CHOICES
+    
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    filters = models.JSONField(default=dict, blank=True, help_text="Ticket list filters")
+    # Identical exports by the same user share a job while it is fresh
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    token = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    file = models.FileField(upload_to='exports/', blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0, help_text="Tickets matching when the export started")
+    # Checkpoint: everything up to ``last_id`` is in the first ``bytes_written`` bytes of the file
+    rows_written = models.PositiveIntegerField(default=0)
+    last_id = models.PositiveIntegerField(default=0)
+    bytes_written = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.get_format_display()} export for {self.user.username} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
 
 
 class TicketComment(models.Model):
@@ -187,7 +482,8 @@ class TicketAttachment(models.Model):
 
 class TicketHistory(models.Model):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='history')
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Empty for changes made by the system, such as SLA breaches
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     action = models.CharField(max_length=100)
     field_changed = models.CharField(max_length=50, blank=True)
     old_value = models.TextField(blank=True)
@@ -195,7 +491,15 @@ class TicketHistory(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"{self.action} on {self.ticket.ticket_number} by {self.user.username}"
+        return f"{self.action} on {self.ticket.ticket_number} by {self.user.username if self.user else 'system'}"
+    
+    @property
+    def change_description(self):
+        """One-line summary shown in the ticket's history"""
+        if not self.field_changed:
+            return f"{self.action} ({self.new_value})" if self.new_value else self.action
+        label = self.field_changed.replace('_', ' ').capitalize()
+        return f"{self.action}: {label} from \"{self.old_value or 'none'}\" to \"{self.new_value or 'none'}\""
     
     class Meta:
         ordering = ['-timestamp']
@@ -0,0 +1,143 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Department, Ticket, TicketSequence
+from .reference_data import get_reference_data
+
+
+# Ticket numbers are "<prefix><zero-padded sequence value>", e.g. TK00000042
+TICKET_NUMBER_PREFIX = getattr(settings, 'TICKET_NUMBER_PREFIX', 'TK')
+TICKET_NUMBER_PADDING = getattr(settings, 'TICKET_NUMBER_PADDING', 8)
+
+# Numbers each worker reserves per trip to the sequence table. Numbers left
+# in a block when a worker exits are never issued, so larger blocks mean
+# fewer queries but bigger gaps.
+TICKET_NUMBER_BLOCK_SIZE = getattr(settings, 'TICKET_NUMBER_BLOCK_SIZE', 50)
+
+
+def format_ticket_number(prefix, value):
+    return f"{prefix}{value:0{TICKET_NUMBER_PADDING}d}"
+
+
+def ticket_prefix(department_id):
+    """The department's own prefix, or the global one"""
+    for department in get_reference_data().departments:
+        if department.pk == department_id:
+            return department.ticket_prefix or TICKET_NUMBER_PREFIX
+    # Created since the snapshot was taken
+    prefix = Department.objects.filter(pk=department_id).values_list('ticket_prefix', flat=True).first()
+    return prefix or TICKET_NUMBER_PREFIX
+
+
+def _first_free_value(prefix):
+    """One past the highest number already issued with this prefix"""
+    highest = 0
+    numbers = Ticket.objects.filter(ticket_number__startswith=prefix).values_list('ticket_number', flat=True)
+    for number in numbers.iterator():
+        suffix = number[len(prefix):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest + 1
+
+
+def reserve_block(prefix, size):
+    """
+    Reserve ``size`` consecutive values of the prefix's sequence.
+
+    Returns ``(start, stop)``. The UPDATE locks the sequence row until the
+    surrounding transaction ends, so concurrent workers always get
+    disjoint blocks.
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                if TicketSequence.objects.filter(prefix=prefix).update(next_value=F('next_value') + size):
+                    stop = TicketSequence.objects.filter(prefix=prefix).values_list('next_value', flat=True).get()
+                    return stop - size, stop
+                # First number with this prefix; start past any existing ones
+                start = _first_free_value(prefix)
+                TicketSequence.objects.create(prefix=prefix, next_value=start + size)
+                return start, start + size
+        except IntegrityError:
+            # Another worker created the row first; take a block from it
+            continue
+
+
+class TicketNumberAllocator:
+    """
+    Hands out ticket numbers from blocks reserved in the sequence table.
+
+    A block reserved inside a transaction only joins the pool once that
+    transaction commits; if it rolls back, the sequence row is restored
+    and the numbers may be handed to another worker, so they must not be
+    reused here.
+    """
+
+    def __init__(self, block_size=TICKET_NUMBER_BLOCK_SIZE):
+        self.block_size = block_size
+        self.blocks = defaultdict(list)  # prefix -> [[next, stop], ...]
+        self.lock = threading.Lock()
+
+    def _take(self, prefix, count):
+        values = []
+        with self.lock:
+            blocks = self.blocks[prefix]
+            while blocks and len(values) < count:
+                block = blocks[0]
+                taken = min(count - len(values), block[1] - block[0])
+                values.extend(range(block[0], block[0] + taken))
+                block[0] += taken
+                if block[0] == block[1]:
+                    blocks.pop(0)
+        return values
+
+    def _release(self, prefix, start, stop):
+        if start < stop:
+            with self.lock:
+                self.blocks[prefix].append([start, stop])
+
+    def allocate(self, prefix, count=1):
+        """``count`` unused sequence values for the prefix, in ascending order"""
+        values = self._take(prefix, count)
+        missing = count - len(values)
+        if missing:
+            # One reservation covers the shortfall and refills the pool
+            start, stop = reserve_block(prefix, max(missing, self.block_size))
+            values.extend(range(start, start + missing))
+            transaction.on_commit(lambda: self._release(prefix, start + missing, stop))
+        return values
+
+    def reset(self):
+        with self.lock:
+            self.blocks.clear()
+
+
+allocator = TicketNumberAllocator()
+
+
+def next_ticket_number(department_id):
+    prefix = ticket_prefix(department_id)
+    return format_ticket_number(prefix, allocator.allocate(prefix)[0])
+
+
+def assign_ticket_numbers(tickets):
+    """
+    Number unsaved tickets in bulk, e.g. before ``Ticket.objects.bulk_create``.
+
+    Tickets that already have a number are left alone. Each prefix costs
+    at most one reservation however many tickets are numbered. Note that
+    ``bulk_create`` skips ``Ticket.save``, so due dates and the ticket
+    counters are the caller's to handle.
+    """
+    by_prefix = defaultdict(list)
+    for ticket in tickets:
+        if not ticket.ticket_number:
+            by_prefix[ticket_prefix(ticket.department_id)].append(ticket)
+    for prefix, group in by_prefix.items():
+        for ticket, value in zip(group, allocator.allocate(prefix, len(group))):
+            ticket.ticket_number = format_ticket_number(prefix, value)
+    return tickets
@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(ticket, direction):
+    """Opaque token pointing just past ``ticket`` in the given direction"""
+    data = json.dumps([direction, ticket.created_at.isoformat(), ticket.pk])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if direction not in ('next', 'prev') or created_at is None or not isinstance(pk, int):
+        raise InvalidCursor('Invalid cursor')
+    return direction, created_at, pk
+
+
+class CursorPage:
+    """
+    One page of tickets in ``(-created_at, -id)`` order.
+
+    Mirrors the parts of Django's ``Page`` the templates use, with cursor
+    tokens in place of page numbers.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over tickets, newest first.
+
+    Each page seeks straight to its position with an indexed range filter on
+    ``(created_at, id)`` instead of an OFFSET, so deep pages cost the same as
+    the first one. ``count`` is capped at ``count_limit`` so the total never
+    needs a full scan; ``count_capped`` tells templates to show "N+".
+    """
+
+    def __init__(self, queryset, per_page, count_limit=1000):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.per_page = per_page
+        self.count_limit = count_limit
+        self._count = None
+
+    def page(self, cursor=None):
+        tickets = self.queryset
+        direction = 'next'
+        if cursor:
+            direction, created_at, pk = decode_cursor(cursor)
+            if direction == 'next':
+                tickets = tickets.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+            else:
+                tickets = tickets.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')
+
+        # One extra row tells us whether there is anything beyond this page
+        rows = list(tickets[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows, None, None, self)
+
+        if direction == 'next':
+            has_next, has_previous = has_more, bool(cursor)
+        else:
+            has_next, has_previous = True, has_more
+        return CursorPage(
+            rows,
+            encode_cursor(rows[-1], 'next') if has_next else None,
+            encode_cursor(rows[0], 'prev') if has_previous else None,
+            self,
+        )
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = self.queryset[:self.count_limit + 1].count()
+        return min(self._count, self.count_limit)
+
+    @property
+    def count_capped(self):
+        return self.count >= self.count_limit and self._count > self.count_limit
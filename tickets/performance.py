@@ -0,0 +1,214 @@
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+
+from .batch import add_to_rows
+from .models import AgentDailyPerformance, AgentDurationBucket, Ticket
+from .rollups import RESOLVED_STATUSES, _local_day, _microseconds
+from .stats import ALL_DEPARTMENTS
+
+
+# Histogram buckets per doubling of the duration; 4 keeps medians within ~9%
+BUCKETS_PER_DOUBLING = 4
+
+# Bucket 0 holds everything up to a minute, the last everything past ~2 years
+BUCKET_BASE = 60
+MAX_BUCKET = 80
+
+PERFORMANCE_COUNTS = ['handled_count', 'resolved_count']
+
+# Ticket values the scorecards are derived from
+PERFORMANCE_FIELDS = [
+    'status', 'department_id', 'created_at', 'resolved_at', 'assigned_to_id', 'first_response_at',
+    'first_responder_id',
+]
+
+
+def duration_bucket(seconds):
+    if seconds <= BUCKET_BASE:
+        return 0
+    return min(MAX_BUCKET, int(math.log2(seconds / BUCKET_BASE) * BUCKETS_PER_DOUBLING) + 1)
+
+
+def bucket_bounds(bucket):
+    """Shortest and longest duration in seconds that fall in a bucket"""
+    if bucket == 0:
+        return 0, BUCKET_BASE
+    lower = BUCKET_BASE * 2 ** ((bucket - 1) / BUCKETS_PER_DOUBLING)
+    return lower, lower * 2 ** (1 / BUCKETS_PER_DOUBLING)
+
+
+def contributions(values):
+    """
+    Scorecard increments for one ticket: ``(performance, buckets)``, keyed
+    by (day, agent, department) and (day, agent, department, metric, bucket).
+
+    The first response is filed under the responder and the day it was
+    given, the resolution under the assignee and the day it happened; both
+    under the ticket's department.
+    """
+    performance = defaultdict(Counter)
+    buckets = Counter()
+
+    if values['first_response_at'] is not None and values['first_responder_id'] is not None:
+        delta = values['first_response_at'] - values['created_at']
+        key = (_local_day(values['first_response_at']), values['first_responder_id'], values['department_id'])
+        performance[key]['handled_count'] += 1
+        performance[key]['first_response_us'] += _microseconds(delta)
+        buckets[key + ('first_response', duration_bucket(delta.total_seconds()))] += 1
+
+    if (values['status'] in RESOLVED_STATUSES and values['resolved_at'] is not None
+            and values['assigned_to_id'] is not None):
+        delta = values['resolved_at'] - values['created_at']
+        key = (_local_day(values['resolved_at']), values['assigned_to_id'], values['department_id'])
+        performance[key]['resolved_count'] += 1
+        performance[key]['resolution_us'] += _microseconds(delta)
+        buckets[key + ('resolution', duration_bucket(delta.total_seconds()))] += 1
+
+    return performance, buckets
+
+
+def apply_deltas(performance, buckets):
+    increments = {}
+    for key, counts in performance.items():
+        increments[key] = {field: counts[field] for field in PERFORMANCE_COUNTS if counts[field]}
+        for metric in ('first_response', 'resolution'):
+            if counts[f'{metric}_us']:
+                increments[key][f'{metric}_time'] = timedelta(microseconds=counts[f'{metric}_us'])
+    add_to_rows(AgentDailyPerformance, ['day', 'agent_id', 'department_id'], increments)
+    add_to_rows(
+        AgentDurationBucket, ['day', 'agent_id', 'department_id', 'metric', 'bucket'],
+        {key: {'count': count} for key, count in buckets.items()},
+    )
+
+
+def record_changes(changes):
+    """Apply ``(before, after)`` ticket value pairs to the agent scorecards"""
+    performance = defaultdict(Counter)
+    buckets = Counter()
+    for before, after in changes:
+        for values, sign in ((before, -1), (after, 1)):
+            if values is None:
+                continue
+            ticket_performance, ticket_buckets = contributions(values)
+            for key, counts in ticket_performance.items():
+                for field, count in counts.items():
+                    performance[key][field] += sign * count
+            for key, count in ticket_buckets.items():
+                buckets[key] += sign * count
+    apply_deltas(performance, buckets)
+
+
+def forget_agent(user_id):
+    """Drop a deleted agent's scorecard rows"""
+    AgentDailyPerformance.objects.filter(agent_id=user_id).delete()
+    AgentDurationBucket.objects.filter(agent_id=user_id).delete()
+
+
+def backfill_performance(chunk_size=2000):
+    """Rebuild the agent scorecards from the ticket table; returns the rows written"""
+    performance = defaultdict(Counter)
+    buckets = Counter()
+    tickets = Ticket.objects.filter(first_response_at__isnull=False) | Ticket.objects.filter(resolved_at__isnull=False)
+    for values in tickets.order_by().values(*PERFORMANCE_FIELDS).iterator(chunk_size=chunk_size):
+        ticket_performance, ticket_buckets = contributions(values)
+        for key, counts in ticket_performance.items():
+            performance[key].update(counts)
+        buckets.update(ticket_buckets)
+
+    with transaction.atomic():
+        AgentDailyPerformance.objects.all().delete()
+        AgentDurationBucket.objects.all().delete()
+        AgentDailyPerformance.objects.bulk_create([
+            AgentDailyPerformance(
+                day=day,
+                agent_id=agent_id,
+                department_id=department_id,
+                handled_count=counts['handled_count'],
+                resolved_count=counts['resolved_count'],
+                first_response_time=timedelta(microseconds=counts['first_response_us']),
+                resolution_time=timedelta(microseconds=counts['resolution_us']),
+            )
+            for (day, agent_id, department_id), counts in performance.items()
+        ], batch_size=1000)
+        AgentDurationBucket.objects.bulk_create([
+            AgentDurationBucket(
+                day=day, agent_id=agent_id, department_id=department_id, metric=metric, bucket=bucket, count=count,
+            )
+            for (day, agent_id, department_id, metric, bucket), count in buckets.items()
+        ], batch_size=1000)
+    return len(performance) + len(buckets)
+
+
+def histogram_median(histogram):
+    """
+    Median seconds of a ``{bucket: count}`` histogram, interpolated
+    geometrically inside the bucket it falls in; None when empty.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    middle = total / 2
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if count and seen + count >= middle:
+            lower, upper = bucket_bounds(bucket)
+            fraction = (middle - seen) / count
+            if bucket == 0:
+                return upper * fraction
+            return lower * (upper / lower) ** fraction
+        seen += count
+    return None
+
+
+def _hours(seconds):
+    return None if seconds is None else round(seconds / 3600, 1)
+
+
+def agent_scorecards(date_from, date_to, department_id=ALL_DEPARTMENTS, limit=10):
+    """
+    Scorecards of the agents active between two dates, busiest first.
+
+    Read from the daily performance rows and histograms, so the cost
+    depends on the number of days and agents, not on the ticket history.
+    Unless ``department_id`` is ``ALL_DEPARTMENTS``, only work on that
+    department's tickets counts, whichever department the agents belong to
+    now.
+    """
+    performance = AgentDailyPerformance.objects.filter(day__range=[date_from, date_to])
+    buckets = AgentDurationBucket.objects.filter(day__range=[date_from, date_to], count__gt=0)
+    if department_id != ALL_DEPARTMENTS:
+        performance = performance.filter(department_id=department_id)
+        buckets = buckets.filter(department_id=department_id)
+
+    totals = {
+        row['agent_id']: row
+        for row in performance.values('agent_id').annotate(
+            handled=Sum('handled_count'),
+            resolved=Sum('resolved_count'),
+        )
+        if row['handled'] or row['resolved']
+    }
+    histograms = defaultdict(dict)
+    for row in buckets.values('agent_id', 'metric', 'bucket').annotate(total=Sum('count')):
+        histograms[(row['agent_id'], row['metric'])][row['bucket']] = row['total']
+
+    busiest = sorted(totals.values(), key=lambda row: (-(row['handled'] + row['resolved']), row['agent_id']))[:limit]
+    users = User.objects.in_bulk([row['agent_id'] for row in busiest])
+    cards = []
+    for row in busiest:
+        user = users.get(row['agent_id'])
+        cards.append({
+            'agent_id': row['agent_id'],
+            'name': (user.get_full_name() or user.username) if user else f"User #{row['agent_id']}",
+            'handled': row['handled'],
+            'resolved': row['resolved'],
+            'median_first_response_hours': _hours(histogram_median(histograms[(row['agent_id'], 'first_response')])),
+            'median_resolution_hours': _hours(histogram_median(histograms[(row['agent_id'], 'resolution')])),
+        })
+    return cards
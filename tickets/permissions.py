@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+
+from django.db.models import Q
+
+from .models import UserProfile
+
+
+# UserProfile columns kept with the role so the profile form needs no query
+PROFILE_FIELDS = ['id', 'department_id', 'phone', 'job_title', 'is_agent', 'is_supervisor']
+
+
+@dataclass(frozen=True)
+class Role:
+    """
+    What a user is and which tickets they may touch.
+
+    Built once per request from the user's profile; every check after that
+    only compares ids already on the ticket rows, so a whole page of tickets
+    can be evaluated without touching related objects.
+    """
+    user_id: int = None
+    is_agent: bool = False
+    is_supervisor: bool = False
+    department_id: int = None
+    profile_values: dict = field(default=None, compare=False)
+
+    @property
+    def kind(self):
+        if self.is_supervisor:
+            return 'supervisor'
+        if self.is_agent:
+            return 'agent'
+        return 'submitter' if self.user_id else 'anonymous'
+
+    @property
+    def is_staff_member(self):
+        """Agents and supervisors"""
+        return self.is_agent or self.is_supervisor
+
+    def profile(self):
+        """The user's profile rebuilt from the cached values, or None if they have none"""
+        if self.profile_values is None:
+            return None
+        profile = UserProfile(user_id=self.user_id, **self.profile_values)
+        profile._state.adding = False
+        return profile
+
+    def can_see_internal_notes(self):
+        return self.is_staff_member
+
+    def visible_q(self):
+        """Q object matching the tickets the user may open"""
+        if self.is_supervisor:
+            return Q()
+        if self.is_agent:
+            return Q(assigned_to_id=self.user_id) | Q(department_id=self.department_id)
+        return Q(submitter_id=self.user_id)
+
+    def filter_visible(self, queryset):
+        return queryset.filter(self.visible_q())
+
+    def can_edit(self, ticket):
+        """Edit the ticket; agents only edit tickets of their own or their department"""
+        if self.is_supervisor:
+            return True
+        if self.is_agent:
+            return ticket.assigned_to_id == self.user_id or ticket.department_id == self.department_id
+        return ticket.submitter_id == self.user_id
+
+    def can_comment(self, ticket):
+        """Comment on and attach files to the ticket; anyone may on their own tickets"""
+        return self.can_edit(ticket) or ticket.submitter_id == self.user_id
+
+    can_upload = can_comment
+
+    def annotate(self, tickets):
+        """
+        Set ``can_edit``, ``can_comment`` and ``can_upload`` on each ticket.
+
+        Meant for a page of already loaded tickets; no queries are made.
+        """
+        for ticket in tickets:
+            ticket.can_edit = self.can_edit(ticket)
+            ticket.can_comment = ticket.can_upload = self.can_comment(ticket)
+        return tickets
+
+
+ANONYMOUS_ROLE = Role()
+
+
+def get_role(user):
+    """
+    The user's role, built from their profile.
+
+    The session user is loaded together with the profile by
+    ``ProfileModelBackend``, so this makes no queries; nothing is cached,
+    and a profile change applies from the next request on.
+    """
+    if not user.is_authenticated:
+        return ANONYMOUS_ROLE
+    try:
+        profile = user.userprofile
+    except UserProfile.DoesNotExist:
+        profile = None
+    if profile is None:
+        return Role(user_id=user.pk)
+    return Role(
+        user_id=user.pk,
+        is_agent=profile.is_agent,
+        is_supervisor=profile.is_supervisor,
+        department_id=profile.department_id,
+        profile_values={name: getattr(profile, name) for name in PROFILE_FIELDS},
+    )
+
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from .models import Category, Department, Priority, ReferenceDataVersion, SLA
+
+
+# Seconds a worker trusts its snapshot before re-reading the version stamp
+REFERENCE_DATA_CHECK_INTERVAL = getattr(settings, 'REFERENCE_DATA_CHECK_INTERVAL', 5)
+
+
+class ReferenceData:
+    """Snapshot of the lookup tables the forms, filters and SLA engine read"""
+
+    def __init__(self, version):
+        self.version = version
+        self.departments = list(Department.objects.all())
+        self.categories = list(Category.objects.select_related('department'))
+        self.priorities = list(Priority.objects.all())
+        self.agents = list(
+            User.objects.filter(userprofile__is_agent=True).select_related('userprofile').order_by('username')
+        )
+        self.priority_map = {priority.pk: priority for priority in self.priorities}
+        # Active SLA per (department_id, priority_id)
+        self.sla_matrix = {
+            (sla.department_id, sla.priority_id): sla for sla in SLA.objects.filter(is_active=True)
+        }
+
+    @property
+    def active_departments(self):
+        return [department for department in self.departments if department.is_active]
+
+    @property
+    def active_categories(self):
+        return [category for category in self.categories if category.is_active]
+
+    def department_categories(self, department_id):
+        """Active categories of a department, by name"""
+        return sorted(
+            (c for c in self.active_categories if c.department_id == department_id),
+            key=lambda category: category.name,
+        )
+
+
+_snapshot = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def _stored_version():
+    return ReferenceDataVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def get_reference_data():
+    """
+    The current snapshot, reloaded when another worker has bumped the stamp.
+
+    The stamp is re-read at most every ``REFERENCE_DATA_CHECK_INTERVAL``
+    seconds, so most renders use the snapshot without any query.
+    """
+    global _snapshot, _checked_at
+    now = time.monotonic()
+    if _snapshot is not None and now - _checked_at < REFERENCE_DATA_CHECK_INTERVAL:
+        return _snapshot
+
+    with _lock:
+        if _snapshot is None or now - _checked_at >= REFERENCE_DATA_CHECK_INTERVAL:
+            version = _stored_version()
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = ReferenceData(version)
+            _checked_at = now
+    return _snapshot
+
+
+def bump_version():
+    global _snapshot
+    if not ReferenceDataVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        ReferenceDataVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+    # This worker reloads straight away; others notice on their next check
+    _snapshot = None
+
+
+def invalidate():
+    """Bump the version stamp once the surrounding transaction commits"""
+    transaction.on_commit(bump_version)
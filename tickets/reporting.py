@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Ticket
+from .performance import agent_scorecards
+from .resolution import resolution_report
+from .rollups import rollup_breakdown, rollup_daily, rollup_resolution
+from .staffing import arrival_heatmap, backlog_aging
+from .stats import ACTIVE_STATUSES, ALL_DEPARTMENTS, day_range_q, department_q, overdue_q
+from .stats_cache import get_versions
+
+
+logger = logging.getLogger(__name__)
+
+# Threads running report sections side by side; 1 runs them one by one.
+# SQLite executes queries in this process, so more threads than cores
+# only add switching
+REPORT_SECTION_WORKERS = getattr(settings, 'REPORT_SECTION_WORKERS', min(4, os.cpu_count() or 1))
+
+# Days shown by the reports when no range is given
+REPORT_DEFAULT_DAYS = 30
+
+# Seconds a report including today is kept. Ticket changes in its scope
+# and deadlines passing drop it sooner; this is a backstop
+REPORT_CACHE_TTL = getattr(settings, 'REPORT_CACHE_TTL', 60)
+
+# Seconds a report of a range entirely in the past is kept, on the same terms
+REPORT_CACHE_PAST_TTL = getattr(settings, 'REPORT_CACHE_PAST_TTL', 24 * 3600)
+
+REPORT_KEY = 'ticket-report:{}:{}:{}:{}'
+BACKLOG_KEY = 'ticket-backlog:{}:{}'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=REPORT_SECTION_WORKERS, thread_name_prefix='report')
+    return _pool
+
+
+def can_run_concurrently():
+    """
+    Whether sections may run on other connections than the caller's.
+
+    They can't when the caller is inside a transaction, which other
+    connections wouldn't see into, or uses an in-memory SQLite database,
+    which is private to its connection.
+    """
+    if REPORT_SECTION_WORKERS <= 1 or connection.in_atomic_block:
+        return False
+    return not (connection.vendor == 'sqlite' and connection.is_in_memory_db())
+
+
+def _timed(function, args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def _run_in_worker(function, args):
+    try:
+        return _timed(function, args)
+    finally:
+        # Pool threads never see request_finished, so close here
+        connections.close_all()
+
+
+class ReportExecutor:
+    """
+    Runs independent report sections and times each one.
+
+    Sections are ``name -> (function, *args)``. With a pool, each runs on a
+    worker thread with its own database connection, so the wall-clock time
+    is that of the slowest section rather than the sum; the database
+    driver releases the GIL while a query runs.
+    """
+
+    def __init__(self, concurrent=None):
+        self.concurrent = can_run_concurrently() if concurrent is None else concurrent
+        self.timings = {}
+        self.total = 0
+
+    def run(self, sections):
+        started = time.perf_counter()
+        if self.concurrent:
+            futures = {
+                name: _get_pool().submit(_run_in_worker, section[0], section[1:])
+                for name, section in sections.items()
+            }
+            outcomes = {name: future.result() for name, future in futures.items()}
+        else:
+            outcomes = {name: _timed(section[0], section[1:]) for name, section in sections.items()}
+
+        self.timings = {name: seconds for name, (result, seconds) in outcomes.items()}
+        self.total = time.perf_counter() - started
+        if self.timings:
+            slowest = self.slowest()
+            logger.info(
+                "Report sections took %.1fms (%s); slowest was %s at %.1fms",
+                self.total * 1000, 'concurrent' if self.concurrent else 'serial',
+                slowest, self.timings[slowest] * 1000,
+            )
+        return {name: result for name, (result, seconds) in outcomes.items()}
+
+    def slowest(self):
+        return max(self.timings, key=self.timings.get)
+
+    def server_timing(self):
+        """Value for a ``Server-Timing`` response header"""
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.timings.items()
+        )
+
+
+def default_window(today=None):
+    """Date range of the reports when none is given"""
+    today = today or timezone.localdate()
+    return today - timedelta(days=REPORT_DEFAULT_DAYS), today
+
+
+def compute_report(date_from, date_to, department_id=ALL_DEPARTMENTS):
+    """
+    Report figures for tickets created between two dates, for one
+    department or, with ``ALL_DEPARTMENTS``, all of them.
+
+    Returns the figures and the executor that timed their sections.
+    """
+    scope = department_q(department_id)
+    tickets = Ticket.objects.filter(day_range_q(date_from, date_to))
+    # SLA breaches that happened in the period, whenever the ticket was opened
+    breached = Ticket.objects.filter(day_range_q(date_from, date_to, field='breached_at'))
+    if scope is not None:
+        tickets = tickets.filter(scope)
+        breached = breached.filter(scope)
+
+    # Statistics come from the daily and agent rollups; only the overdue
+    # count depends on the current time and is read from the tickets, and
+    # percentiles need every resolution time
+    executor = ReportExecutor()
+    sections = executor.run({
+        'breakdown': (rollup_breakdown, date_from, date_to, scope),
+        'resolution_totals': (rollup_resolution, date_from, date_to, scope),
+        'agents': (agent_scorecards, date_from, date_to, department_id),
+        'daily': (rollup_daily, date_from, date_to, scope),
+        'overdue': (tickets.filter(overdue_q()).count,),
+        'breached': (breached.count,),
+        'resolution': (resolution_report, date_from, date_to, scope),
+        'arrivals': (arrival_heatmap, date_from, date_to, scope),
+    })
+    stats = sections['breakdown']
+    totals = sections['resolution_totals']
+    resolution = sections['resolution']
+    total_tickets = stats['total']
+    resolved_tickets = stats['by_status']['resolved']
+    closed_tickets = stats['by_status']['closed']
+
+    resolution_rate = 0
+    if total_tickets > 0:
+        resolution_rate = round((resolved_tickets + closed_tickets) / total_tickets * 100, 1)
+
+    avg_resolution_time = None
+    if totals['resolution_count']:
+        avg_seconds = totals['resolution_time'].total_seconds() / totals['resolution_count']
+        avg_resolution_time = round(avg_seconds / 3600, 1)  # Convert to hours
+
+    report = {
+        'total_tickets': total_tickets,
+        'resolved_tickets': resolved_tickets,
+        'closed_tickets': closed_tickets,
+        'overdue_tickets': sections['overdue'],
+        'breached_tickets': sections['breached'],
+        'resolution_rate': resolution_rate,
+        'avg_resolution_time': avg_resolution_time,
+        'dept_stats': stats['dept_stats'],
+        'priority_stats': stats['priority_stats'],
+        'status_stats': stats['status_stats'],
+        'agent_stats': sections['agents'],
+        'daily_stats': sections['daily'],
+        'resolution': resolution,
+        'resolution_breakdowns': [
+            ('Department', resolution['by_department']),
+            ('Priority', resolution['by_priority']),
+            ('Agent', resolution['by_agent'][:10]),
+        ],
+        'arrival_heatmap': sections['arrivals'],
+    }
+    return report, executor
+
+
+def _scope_name(department_id):
+    return 'all' if department_id == ALL_DEPARTMENTS else f'department:{department_id}'
+
+
+def report_cache_key(date_from, date_to, department_id=ALL_DEPARTMENTS):
+    """
+    Cache key and lifetime of a report.
+
+    Keys carry the stats version of the report's scope, so a ticket change
+    in the scope moves them to a new key; tickets created long ago still
+    change status. Ranges entirely in the past are kept longer.
+    """
+    scope = _scope_name(department_id)
+    version = get_versions([scope])[scope]
+    ttl = REPORT_CACHE_PAST_TTL if date_to < timezone.localdate() else REPORT_CACHE_TTL
+    return REPORT_KEY.format(scope, date_from, date_to, version), ttl
+
+
+def report_valid_until(date_from, date_to, department_id=ALL_DEPARTMENTS, now=None):
+    """
+    When the overdue and breach counts of a report next move without any
+    ticket being saved: the earliest deadline still ahead of an active
+    ticket created, or falling due, in the range. None if there is none.
+    """
+    tickets = Ticket.objects.filter(
+        day_range_q(date_from, date_to) | day_range_q(date_from, date_to, field='due_date'),
+        status__in=ACTIVE_STATUSES,
+        due_date__gte=now or timezone.now(),
+    )
+    scope = department_q(department_id)
+    if scope is not None:
+        tickets = tickets.filter(scope)
+    return tickets.aggregate(next_due=Min('due_date'))['next_due']
+
+
+def get_report(date_from, date_to, department_id=ALL_DEPARTMENTS, refresh=False):
+    """
+    Cached ``compute_report`` figures. Returns ``(report, timings)``;
+    ``timings`` is a ``Server-Timing`` header value, which only names the
+    cache on a hit.
+    """
+    key, ttl = report_cache_key(date_from, date_to, department_id)
+    now = timezone.now()
+    entry = None if refresh else cache.get(key)
+    if entry and (entry['valid_until'] is None or now < entry['valid_until']):
+        return entry['report'], 'cache;desc=hit'
+
+    report, executor = compute_report(date_from, date_to, department_id)
+    valid_until = report_valid_until(date_from, date_to, department_id, now)
+    cache.set(key, {'report': report, 'valid_until': valid_until}, ttl)
+    return report, executor.server_timing()
+
+
+def get_backlog(department_id=ALL_DEPARTMENTS, refresh=False):
+    """
+    Cached ``backlog_aging`` of one department or, with
+    ``ALL_DEPARTMENTS``, all of them.
+
+    The backlog doesn't depend on a report's date range, and it ages with
+    the clock, so it is cached apart from the reports and only for
+    ``REPORT_CACHE_TTL`` seconds, under the stats version of its scope.
+    """
+    scope = _scope_name(department_id)
+    key = BACKLOG_KEY.format(scope, get_versions([scope])[scope])
+    backlog = None if refresh else cache.get(key)
+    if backlog is None:
+        backlog = backlog_aging(department_q(department_id))
+        cache.set(key, backlog, REPORT_CACHE_TTL)
+    return backlog
@@ -0,0 +1,198 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .batch import add_to_rows
+from .models import DailyTicketRollup, Ticket
+from .stats import day_range_q, rollup_stats
+
+
+# Statuses whose resolution time counts towards the reports' average
+RESOLVED_STATUSES = ['resolved', 'closed']
+
+ROLLUP_DIMENSIONS = ['department_id', 'priority_id', 'status', 'assigned_to_id']
+
+ROLLUP_COUNTS = ['created_count', 'resolved_count', 'closed_count', 'resolution_count']
+
+
+def _local_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _microseconds(delta):
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def contributions(values):
+    """
+    Rollup increments for one ticket, keyed by (day, *dimensions).
+
+    ``created_count`` and the resolution totals are filed under the creation
+    day, so a date range selects the same tickets as a ``created_at`` filter.
+    ``resolved_count`` and ``closed_count`` are filed under the day the event
+    happened and feed the trend chart. Resolution time is carried in
+    microseconds so increments stay plain integers.
+    """
+    dims = tuple(values[field] for field in ROLLUP_DIMENSIONS)
+    rows = defaultdict(Counter)
+
+    if values['created_at'] is not None:
+        created = rows[(_local_day(values['created_at']),) + dims]
+        created['created_count'] += 1
+        if values['status'] in RESOLVED_STATUSES and values['resolved_at'] is not None:
+            created['resolution_count'] += 1
+            created['resolution_us'] += _microseconds(values['resolved_at'] - values['created_at'])
+    if values['resolved_at'] is not None:
+        rows[(_local_day(values['resolved_at']),) + dims]['resolved_count'] += 1
+    if values['closed_at'] is not None:
+        rows[(_local_day(values['closed_at']),) + dims]['closed_count'] += 1
+    return rows
+
+
+def apply_deltas(deltas):
+    """Add each row's increments to its rollup, creating missing rows"""
+    increments = {}
+    for key, counts in deltas.items():
+        increments[key] = {field: counts[field] for field in ROLLUP_COUNTS if counts[field]}
+        if counts['resolution_us']:
+            increments[key]['resolution_time'] = timedelta(microseconds=counts['resolution_us'])
+    add_to_rows(DailyTicketRollup, ['day', *ROLLUP_DIMENSIONS], increments)
+
+
+def record_changes(changes):
+    """Apply ``(before, after)`` ticket value pairs to the daily rollups"""
+    deltas = defaultdict(Counter)
+    for before, after in changes:
+        if before is not None:
+            for key, increments in contributions(before).items():
+                deltas[key].subtract(increments)
+        if after is not None:
+            for key, increments in contributions(after).items():
+                deltas[key].update(increments)
+    apply_deltas(deltas)
+
+
+def reassign_rollups(user_id):
+    """Fold a deleted agent's rollups into the unassigned rows"""
+    for rollup in DailyTicketRollup.objects.filter(assigned_to_id=user_id):
+        increments = Counter({field: getattr(rollup, field) for field in ROLLUP_COUNTS})
+        increments['resolution_us'] = _microseconds(rollup.resolution_time)
+        apply_deltas({
+            (rollup.day, rollup.department_id, rollup.priority_id, rollup.status, None): increments,
+        })
+        rollup.delete()
+
+
+def _grouped(tickets, date_field, **aggregates):
+    day = TruncDate(date_field, tzinfo=timezone.get_current_timezone())
+    return tickets.filter(**{f'{date_field}__isnull': False}).order_by().annotate(
+        rollup_day=day
+    ).values('rollup_day', *ROLLUP_DIMENSIONS).annotate(**aggregates)
+
+
+def backfill_rollups(since=None):
+    """
+    Rebuild the daily rollups from the ticket table with grouped queries.
+
+    When ``since`` is given only rollup days from that date onwards are
+    replaced; each day's rows are derived from the tickets created, resolved
+    or closed on that day, so older days are left untouched.
+    """
+    resolved = Q(status__in=RESOLVED_STATUSES, resolved_at__isnull=False)
+    resolution_time = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())
+
+    rows = defaultdict(dict)
+    sources = [
+        ('created_at', {
+            'created_count': Count('id'),
+            'resolution_count': Count('id', filter=resolved),
+            'resolution_time': Sum(resolution_time, filter=resolved),
+        }),
+        ('resolved_at', {'resolved_count': Count('id')}),
+        ('closed_at', {'closed_count': Count('id')}),
+    ]
+
+    with transaction.atomic():
+        for date_field, aggregates in sources:
+            tickets = Ticket.objects.all()
+            if since is not None:
+                tickets = tickets.filter(day_range_q(since, field=date_field))
+            for row in _grouped(tickets, date_field, **aggregates):
+                key = (row['rollup_day'],) + tuple(row[field] for field in ROLLUP_DIMENSIONS)
+                rows[key].update({name: row[name] for name in aggregates})
+
+        stale = DailyTicketRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+
+        DailyTicketRollup.objects.bulk_create([
+            DailyTicketRollup(
+                day=day,
+                department_id=department_id,
+                priority_id=priority_id,
+                status=status,
+                assigned_to_id=assigned_to_id,
+                created_count=values.get('created_count', 0),
+                resolved_count=values.get('resolved_count', 0),
+                closed_count=values.get('closed_count', 0),
+                resolution_count=values.get('resolution_count', 0),
+                resolution_time=values.get('resolution_time') or timedelta(0),
+            )
+            for (day, department_id, priority_id, status, assigned_to_id), values in rows.items()
+        ], batch_size=1000)
+    return len(rows)
+
+
+def _rollups(date_from, date_to, scope):
+    rollups = DailyTicketRollup.objects.filter(day__range=[date_from, date_to])
+    if scope is not None:
+        rollups = rollups.filter(scope)
+    return rollups
+
+
+def rollup_breakdown(date_from, date_to, scope=None):
+    """
+    Totals and department/priority/status breakdowns, in the shape of
+    ``compute_ticket_stats`` with the time-dependent overdue count left at
+    zero.
+    """
+    rows = _rollups(date_from, date_to, scope).filter(created_count__gt=0).values(
+        'status', 'priority__name', 'priority__level', 'department__name'
+    ).annotate(count=Sum('created_count'))
+    return rollup_stats({**row, 'overdue': 0} for row in rows)
+
+
+def rollup_resolution(date_from, date_to, scope=None):
+    """Number of resolved tickets and their summed resolution time"""
+    resolution = _rollups(date_from, date_to, scope).aggregate(
+        count=Sum('resolution_count'),
+        total=Sum('resolution_time'),
+    )
+    return {
+        'resolution_count': resolution['count'] or 0,
+        'resolution_time': resolution['total'] or timedelta(0),
+    }
+
+
+def rollup_daily(date_from, date_to, scope=None):
+    """Created, resolved and closed counts for every day of the range"""
+    daily = {
+        row['day']: row
+        for row in _rollups(date_from, date_to, scope).values('day').annotate(
+            created=Sum('created_count'),
+            resolved=Sum('resolved_count'),
+            closed=Sum('closed_count'),
+        )
+    }
+    # Fill quiet days so the trend chart has an evenly spaced axis
+    return [
+        daily.get(day, {'day': day, 'created': 0, 'resolved': 0, 'closed': 0})
+        for day in (date_from + timedelta(days=offset)
+                    for offset in range((date_to - date_from).days + 1))
+    ]
+
@@ -0,0 +1,213 @@
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, FloatField, Func, Q, Value
+from django.utils.module_loading import import_string
+
+
+FTS_TABLE = 'tickets_ticket_fts'
+
+# Column weights for BM25 ranking, in FTS table column order
+FTS_WEIGHTS = {
+    'ticket_number': 10.0,
+    'title': 5.0,
+    'tags': 3.0,
+    'description': 1.0,
+    'resolution': 1.0,
+    'comments': 1.0,
+    'internal_notes': 1.0,
+}
+
+# Columns anyone who can see the ticket may match against
+PUBLIC_COLUMNS = ['ticket_number', 'title', 'tags', 'description', 'resolution', 'comments']
+
+
+def _comment_text(ticket_column, internal):
+    return (
+        "(SELECT coalesce(group_concat(comment, ' '), '') FROM tickets_ticketcomment "
+        f"WHERE ticket_id = {ticket_column} AND is_internal = {int(internal)})"
+    )
+
+
+def _refresh_comments(ticket_column):
+    return (
+        f"UPDATE {FTS_TABLE} SET comments = {_comment_text(ticket_column, False)}, "
+        f"internal_notes = {_comment_text(ticket_column, True)} WHERE rowid = {ticket_column};"
+    )
+
+
+# SQLite drops a table's triggers whenever a migration rebuilds it, so these
+# are reinstalled after every migrate (see signals.py)
+TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticket_fts_insert AFTER INSERT ON tickets_ticket BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_WEIGHTS)})
+        VALUES (new.id, new.ticket_number, new.title, new.tags, new.description, new.resolution, '', '');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticket_fts_update
+    AFTER UPDATE OF ticket_number, title, tags, description, resolution ON tickets_ticket BEGIN
+        UPDATE {FTS_TABLE} SET
+            ticket_number = new.ticket_number, title = new.title, tags = new.tags,
+            description = new.description, resolution = new.resolution
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticket_fts_delete AFTER DELETE ON tickets_ticket BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticketcomment_fts_insert AFTER INSERT ON tickets_ticketcomment BEGIN
+        {_refresh_comments('new.ticket_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticketcomment_fts_update
+    AFTER UPDATE OF comment, is_internal, ticket_id ON tickets_ticketcomment BEGIN
+        {_refresh_comments('old.ticket_id')}
+        {_refresh_comments('new.ticket_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_ticketcomment_fts_delete AFTER DELETE ON tickets_ticketcomment BEGIN
+        {_refresh_comments('old.ticket_id')}
+    END
+    """,
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_WEIGHTS)})
+    SELECT t.id, t.ticket_number, t.title, t.tags, t.description, t.resolution,
+           {_comment_text('t.id', False)}, {_comment_text('t.id', True)}
+    FROM tickets_ticket t
+    """,
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')",
+]
+
+
+class SearchBackend:
+    """Ticket search used by the ticket list"""
+
+    def filter(self, queryset, term, include_internal=False):
+        """
+        Restrict ``queryset`` to tickets matching ``term``.
+
+        Backends that can rank results order the queryset by relevance;
+        callers that need another order can re-order it afterwards.
+        """
+        raise NotImplementedError
+
+    def search(self, term, include_internal=False, limit=100):
+        """Ids of the best matching tickets, best first"""
+        from .models import Ticket
+
+        tickets = self.filter(Ticket.objects.all(), term, include_internal)
+        return list(tickets.values_list('id', flat=True)[:limit])
+
+    def rebuild(self):
+        """Rebuild any index from the ticket table; returns the ticket count"""
+        return 0
+
+    def install(self, using):
+        """Create or repair whatever keeps the index in sync after migrations"""
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """Unindexed substring matching; works on every database"""
+
+    def filter(self, queryset, term, include_internal=False):
+        match = (
+            Q(title__icontains=term) |
+            Q(description__icontains=term) |
+            Q(ticket_number__icontains=term)
+        )
+        return queryset.filter(match)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    BM25-ranked search over an FTS5 table kept in sync by triggers.
+
+    The ``tickets_ticket_fts`` table mirrors each ticket's text and its
+    comments (public and internal in separate columns). Matching happens in
+    the same query as the caller's role and filter conditions, by joining
+    the FTS table through ``TicketSearchEntry``; the rank is annotated as
+    ``search_rank``.
+    """
+
+    def filter(self, queryset, term, include_internal=False):
+        query = self.match_expression(term, include_internal)
+        if query is None:
+            return queryset.none()
+
+        rank = Func(
+            F('search_entry__document'), *[Value(weight) for weight in FTS_WEIGHTS.values()],
+            function='bm25', output_field=FloatField(),
+        )
+        return queryset.filter(search_entry__document__match=query).annotate(
+            search_rank=rank
+        ).order_by('search_rank', '-created_at', '-id')
+
+    def match_expression(self, term, include_internal=False):
+        """
+        Turn free text into a safe FTS5 query.
+
+        Every word must match, the last one as a prefix so results update
+        while typing. Quoting each word keeps FTS5 operators in user input
+        from being interpreted.
+        """
+        words = re.findall(r'\w+', term)
+        if not words:
+            return None
+        phrases = [f'"{word}"' for word in words]
+        phrases[-1] += '*'
+        query = ' '.join(phrases)
+        if include_internal:
+            return query
+        return f"{{{' '.join(PUBLIC_COLUMNS)}}} : ({query})"
+
+    def rebuild(self):
+        self.install(connection.alias)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in REBUILD_SQL:
+                cursor.execute(sql)
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    def install(self, using):
+        target = connections[using]
+        if target.vendor != 'sqlite' or FTS_TABLE not in target.introspection.table_names():
+            return
+        with target.cursor() as cursor:
+            for sql in TRIGGER_SQL:
+                cursor.execute(sql)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """
+    Backend configured by ``TICKET_SEARCH_BACKEND``.
+
+    Defaults to FTS5 on SQLite and to plain substring matching elsewhere.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                default = (
+                    'tickets.search.SQLiteSearchBackend' if connection.vendor == 'sqlite'
+                    else 'tickets.search.DatabaseSearchBackend'
+                )
+                path = getattr(settings, 'TICKET_SEARCH_BACKEND', default)
+                _backend = import_string(path)()
+    return _backend
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import activity, reference_data
+from .events import comment_payload, publish_on_commit
+from .models import Category, Department, Priority, SLA, Ticket, TicketAttachment, TicketComment, UserProfile
+from .search import get_search_backend
+from .tracking import record_agent_delete, record_ticket_delete
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    record_ticket_delete(instance)
+
+
+@receiver(post_delete, sender=User)
+def agent_deleted(sender, instance, **kwargs):
+    # Tickets assigned to the user were set to NULL without a save
+    record_agent_delete(instance.pk)
+
+
+@receiver(post_save, sender=TicketComment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        activity.comment_added(instance)
+        publish_on_commit(f'ticket:{instance.ticket_id}', comment_payload(instance))
+
+
+@receiver(post_delete, sender=TicketComment)
+def comment_deleted(sender, instance, **kwargs):
+    activity.comment_removed(instance)
+
+
+@receiver(post_save, sender=TicketAttachment)
+def attachment_created(sender, instance, created, **kwargs):
+    if created:
+        activity.attachment_added(instance)
+
+
+@receiver(post_delete, sender=TicketAttachment)
+def attachment_deleted(sender, instance, **kwargs):
+    activity.attachment_removed(instance)
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using, **kwargs):
+    if sender.name == 'tickets':
+        get_search_backend().install(using)
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Priority)
+@receiver([post_save, post_delete], sender=SLA)
+@receiver([post_save, post_delete], sender=UserProfile)
+def reference_data_changed(sender, **kwargs):
+    reference_data.invalidate()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the reference data doesn't display
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        reference_data.invalidate()
@@ -0,0 +1,209 @@
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from .batch import write_rows
+from .breaches import check_breach
+from .models import Priority, Ticket
+from .reference_data import get_reference_data
+from .tracking import TRACKED_FIELDS, record_changes
+
+
+# Working hours per weekday (Monday is 0), e.g. {0: ('09:00', '17:00'), ...}.
+# None means deadlines run round the clock.
+SLA_BUSINESS_HOURS = getattr(settings, 'SLA_BUSINESS_HOURS', None)
+
+# Dates, as date objects or ISO strings, on which no SLA time accrues
+SLA_HOLIDAYS = getattr(settings, 'SLA_HOLIDAYS', [])
+
+DEADLINE_FIELDS = ['response_due_at', 'resolution_due_at', 'due_date']
+
+# Give up on a deadline that would need more calendar days than this
+MAX_CALENDAR_DAYS = 3660
+
+
+class BusinessCalendar:
+    """Working windows in the current time zone that SLA time accrues in"""
+
+    def __init__(self, hours=None, holidays=()):
+        self.hours = None
+        if hours is not None:
+            self.hours = {}
+            for weekday, (opens, closes) in hours.items():
+                opens, closes = self._time(opens), self._time(closes)
+                if opens >= closes:
+                    raise ImproperlyConfigured(f"SLA business hours for weekday {weekday} close before they open")
+                self.hours[int(weekday)] = (opens, closes)
+            if not self.hours:
+                raise ImproperlyConfigured("SLA_BUSINESS_HOURS must open on at least one weekday")
+        self.holidays = {parse_date(day) if isinstance(day, str) else day for day in holidays}
+
+    @staticmethod
+    def _time(value):
+        return parse_time(value) if isinstance(value, str) else value
+
+    @property
+    def is_continuous(self):
+        return self.hours is None and not self.holidays
+
+    def window(self, day):
+        """Aware (opens, closes) for the day, or None if nothing accrues on it"""
+        if day in self.holidays:
+            return None
+        if self.hours is None:
+            opens, closes = datetime.time.min, None
+        elif day.weekday() in self.hours:
+            opens, closes = self.hours[day.weekday()]
+        else:
+            return None
+        start = timezone.make_aware(datetime.datetime.combine(day, opens))
+        if closes is None:
+            end = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+        else:
+            end = timezone.make_aware(datetime.datetime.combine(day, closes))
+        return start, end
+
+    def add_hours(self, start, hours):
+        """The moment ``hours`` of working time after ``start``"""
+        if self.is_continuous:
+            return start + datetime.timedelta(hours=hours)
+
+        remaining = datetime.timedelta(hours=hours)
+        current = timezone.localtime(start)
+        day = current.date()
+        for _ in range(MAX_CALENDAR_DAYS):
+            window = self.window(day)
+            if window is not None:
+                begin, end = max(current, window[0]), window[1]
+                if begin < end:
+                    if remaining <= end - begin:
+                        return begin + remaining
+                    remaining -= end - begin
+            day += datetime.timedelta(days=1)
+        raise ValueError(f"No deadline within {MAX_CALENDAR_DAYS} days of {start}")
+
+
+class SLAEngine:
+    """
+    Resolves response and resolution deadlines for tickets.
+
+    Targets come from the active SLA for the ticket's (department,
+    priority) pair, held in the reference data snapshot, and fall back to
+    the priority's response time for both deadlines.
+    """
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def targets(self, department_id, priority_id):
+        """``(response_hours, resolution_hours)``, or None without a priority"""
+        if priority_id is None:
+            return None
+        data = get_reference_data()
+        sla = data.sla_matrix.get((department_id, priority_id))
+        if sla is not None:
+            return sla.response_time, sla.resolution_time
+        priority = data.priority_map.get(priority_id)
+        if priority is not None:
+            hours = priority.response_time
+        else:
+            # Created since the snapshot was taken
+            hours = Priority.objects.filter(pk=priority_id).values_list('response_time', flat=True).first()
+        if hours is None:
+            return None
+        return hours, hours
+
+    def deadlines(self, department_id, priority_id, start):
+        """``(response_due_at, resolution_due_at)`` for a ticket opened at ``start``"""
+        targets = self.targets(department_id, priority_id)
+        if targets is None:
+            return None, None
+        return tuple(self.calendar.add_hours(start, hours) for hours in targets)
+
+    def apply(self, ticket, previous=None):
+        """
+        Set the deadlines of a new ticket, or of one that moved to another
+        department or priority.
+
+        ``due_date`` follows the resolution deadline unless someone set it
+        by hand; ``previous`` holds the saved values of a changed ticket.
+        """
+        if previous is not None and (previous['department_id'], previous['priority_id']) == (
+                ticket.department_id, ticket.priority_id):
+            return
+        start = ticket.created_at
+        automatic_due = ticket.due_date is None or ticket.due_date == ticket.resolution_due_at
+        ticket.response_due_at, ticket.resolution_due_at = self.deadlines(
+            ticket.department_id, ticket.priority_id, start
+        )
+        if automatic_due:
+            ticket.due_date = ticket.resolution_due_at
+
+
+_engine = None
+
+
+def get_sla_engine():
+    global _engine
+    if _engine is None:
+        _engine = SLAEngine(BusinessCalendar(SLA_BUSINESS_HOURS, SLA_HOLIDAYS))
+    return _engine
+
+
+def recompute_deadlines(tickets=None, chunk_size=1000, dry_run=False):
+    """
+    Re-derive the deadlines of open tickets, e.g. after an SLA edit.
+
+    Tickets are walked in id order ``chunk_size`` at a time; each chunk is
+    read with one ``values()`` query and written back with one batched
+    UPDATE in its own transaction, so memory stays flat and locks
+    stay short. Returns ``(checked, changed)``.
+    """
+    engine = get_sla_engine()
+    if tickets is None:
+        tickets = Ticket.objects.all()
+    tickets = tickets.filter(status__in=Ticket.ACTIVE_STATUSES).order_by('id')
+    fields = list(dict.fromkeys(['id', *TRACKED_FIELDS, 'response_due_at', 'resolution_due_at', 'breached_at']))
+
+    last_id = 0
+    checked = changed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(tickets.filter(id__gt=last_id).values(*fields)[:chunk_size])
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            checked += len(rows)
+
+            updates = []
+            changes = []
+            for row in rows:
+                response, resolution = engine.deadlines(row['department_id'], row['priority_id'], row['created_at'])
+                due_date = row['due_date']
+                if due_date is None or due_date == row['resolution_due_at']:
+                    due_date = resolution
+                # A breach stamp of the old deadline is dropped, and the
+                # scanner stamps the new one once it passes
+                ticket = Ticket(
+                    status=row['status'], due_date=due_date, breached_at=row['breached_at'],
+                    resolved_at=row['resolved_at'], closed_at=row['closed_at'],
+                )
+                check_breach(ticket)
+                new = (response, resolution, due_date, ticket.breached_at)
+                if new == (row['response_due_at'], row['resolution_due_at'], row['due_date'], row['breached_at']):
+                    continue
+                updates.append((row['id'], new))
+                if due_date != row['due_date']:
+                    before = {field: row[field] for field in TRACKED_FIELDS}
+                    changes.append((before, {**before, 'due_date': due_date}))
+
+            changed += len(updates)
+            if updates and not dry_run:
+                write_rows(Ticket, [*DEADLINE_FIELDS, 'breached_at'], updates)
+                # Moved due dates can move tickets in or out of the overdue counters
+                record_changes(changes)
+    return checked, changed
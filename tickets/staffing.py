@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from .models import Ticket
+from .reference_data import get_reference_data
+from .stats import ACTIVE_STATUSES, day_range_q
+
+
+# Age brackets of the open backlog: label and upper bound in days
+AGING_BUCKETS = [
+    ('0–1d', 1),
+    ('1–3d', 3),
+    ('3–7d', 7),
+    ('7–30d', 30),
+    ('30d+', None),
+]
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _age_bucket(now):
+    """Index into AGING_BUCKETS of a ticket's age, as a database expression"""
+    return Case(
+        *[
+            When(created_at__gt=now - timedelta(days=days), then=Value(index))
+            for index, (label, days) in enumerate(AGING_BUCKETS) if days is not None
+        ],
+        default=Value(len(AGING_BUCKETS) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def backlog_aging(scope=None, now=None):
+    """
+    Open tickets per department and age bracket, from one grouped query.
+
+    Returns ``labels`` (the brackets) and ``departments``, a list of
+    ``{'name', 'counts', 'total'}`` with one count per bracket, largest
+    backlog first.
+    """
+    tickets = Ticket.objects.filter(status__in=ACTIVE_STATUSES)
+    if scope is not None:
+        tickets = tickets.filter(scope)
+    rows = tickets.order_by().annotate(bucket=_age_bucket(now or timezone.now())).values(
+        'department_id', 'bucket'
+    ).annotate(count=Count('pk'))
+
+    counts = {}
+    for row in rows:
+        counts.setdefault(row['department_id'], [0] * len(AGING_BUCKETS))[row['bucket']] += row['count']
+
+    names = {department.pk: department.name for department in get_reference_data().departments}
+    departments = [
+        {'name': names.get(department_id, f"#{department_id}"), 'counts': buckets, 'total': sum(buckets)}
+        for department_id, buckets in counts.items()
+    ]
+    departments.sort(key=lambda department: (-department['total'], department['name']))
+    return {'labels': [label for label, days in AGING_BUCKETS], 'departments': departments}
+
+
+def arrival_heatmap(date_from, date_to, scope=None):
+    """
+    Tickets created between two dates by local weekday and hour, from one
+    grouped query.
+
+    Returns ``rows``, one ``{'day', 'cells'}`` per weekday from Monday with
+    24 ``{'hour', 'count', 'level'}`` cells, where ``level`` is the count as
+    a percentage of the busiest hour; and that busiest hour's ``peak``.
+    """
+    tickets = Ticket.objects.filter(day_range_q(date_from, date_to))
+    if scope is not None:
+        tickets = tickets.filter(scope)
+    # Extracted in the current time zone, like the day boundaries
+    rows = tickets.order_by().annotate(
+        weekday=ExtractIsoWeekDay('created_at'), hour=ExtractHour('created_at'),
+    ).values('weekday', 'hour').annotate(count=Count('pk'))
+
+    grid = [[0] * 24 for day in WEEKDAYS]
+    for row in rows:
+        grid[row['weekday'] - 1][row['hour']] = row['count']
+
+    peak = max(max(hours) for hours in grid)
+    return {
+        'peak': peak,
+        'rows': [
+            {
+                'day': day,
+                'cells': [
+                    {'hour': hour, 'count': count, 'level': round(count * 100 / peak) if peak else 0}
+                    for hour, count in enumerate(hours)
+                ],
+            }
+            for day, hours in zip(WEEKDAYS, grid)
+        ],
+    }
@@ -0,0 +1,114 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Ticket
+
+
+ACTIVE_STATUSES = Ticket.ACTIVE_STATUSES
+
+# Report scope of supervisors, who see every department. A department id of
+# None is not this: like the id of any department, it matches its own
+# tickets, which here means none
+ALL_DEPARTMENTS = 'all'
+
+
+def overdue_q(now=None):
+    """Q object matching tickets past their due date that are still active"""
+    return Q(due_date__lt=now or timezone.now(), status__in=ACTIVE_STATUSES)
+
+
+def department_q(department_id):
+    """Q object of a report scope, or None for ``ALL_DEPARTMENTS``"""
+    if department_id == ALL_DEPARTMENTS:
+        return None
+    return Q(department_id=department_id)
+
+
+def day_range_q(date_from=None, date_to=None, field='created_at'):
+    """
+    Q object matching ``field`` between two local dates, both inclusive.
+
+    Built as a half-open datetime range (midnight of ``date_from`` up to
+    midnight after ``date_to`` in the current time zone) so the column is
+    compared directly and its indexes stay usable, unlike ``__date`` lookups.
+    """
+    q = Q()
+    if date_from:
+        q &= Q(**{f'{field}__gte': _local_midnight(date_from)})
+    if date_to:
+        q &= Q(**{f'{field}__lt': _local_midnight(date_to + timedelta(days=1))})
+    return q
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compute_ticket_stats(tickets, now=None):
+    """
+    Collect every dashboard/report figure for a scoped ticket queryset.
+
+    A single GROUP BY over (status, priority, department) with a conditional
+    overdue count is issued; totals and per-dimension breakdowns are then
+    rolled up in Python from those few rows.
+    """
+    rows = tickets.order_by().values(
+        'status', 'priority__name', 'priority__level', 'department__name'
+    ).annotate(
+        count=Count('id'),
+        overdue=Count('id', filter=overdue_q(now)),
+    )
+    return rollup_stats(rows)
+
+
+def rollup_stats(rows):
+    """Fold (status, priority, department) count rows into totals and breakdowns"""
+    total = 0
+    overdue = 0
+    by_status = dict.fromkeys((code for code, _ in Ticket.STATUS_CHOICES), 0)
+    by_priority = {}
+    by_department = {}
+
+    for row in rows:
+        count = row['count']
+        total += count
+        overdue += row['overdue']
+        by_status[row['status']] = by_status.get(row['status'], 0) + count
+
+        priority_key = (row['priority__level'], row['priority__name'])
+        by_priority[priority_key] = by_priority.get(priority_key, 0) + count
+
+        dept_name = row['department__name']
+        by_department[dept_name] = by_department.get(dept_name, 0) + count
+
+    return {
+        'total': total,
+        'overdue': overdue,
+        'by_status': by_status,
+        'priority_stats': [
+            {'priority__name': name, 'priority__level': level, 'count': count}
+            for (level, name), count in sorted(by_priority.items())
+        ],
+        'status_stats': [
+            {'status': status, 'count': count}
+            for status, count in sorted(by_status.items()) if count
+        ],
+        'dept_stats': [
+            {'department__name': name, 'count': count}
+            for name, count in sorted(by_department.items(), key=lambda item: -item[1])
+        ],
+    }
+
+
+def summary_counts(stats):
+    """Flatten computed stats into the counters used by the dashboard cards"""
+    by_status = stats['by_status']
+    return {
+        'total': stats['total'],
+        'open': by_status.get('open', 0),
+        'in_progress': by_status.get('in_progress', 0),
+        'resolved': by_status.get('resolved', 0),
+        'overdue': stats['overdue'],
+    }
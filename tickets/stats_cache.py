@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .models import CacheVersion
+from .stats import ACTIVE_STATUSES, summary_counts
+
+
+# Backstop for entries a missed version bump would leave behind
+STATS_CACHE_TTL = getattr(settings, 'TICKET_STATS_CACHE_TTL', 300)
+
+ENTRY_KEY = 'ticket-stats:{}'
+
+
+def scopes_for_ticket(values):
+    """Version scopes whose stats include a ticket with the given values"""
+    scopes = {'all', f"department:{values['department_id']}", f"submitter:{values['submitter_id']}"}
+    if values['assigned_to_id']:
+        scopes.add(f"agent:{values['assigned_to_id']}")
+    return scopes
+
+
+def get_versions(scopes):
+    """
+    Current stats version of each scope, read with one query.
+
+    The stamps live in the database so every worker sees a bump; with a
+    per-process cache each worker still keeps its own entries, but never
+    serves one older than the latest bump.
+    """
+    stored = dict(CacheVersion.objects.filter(scope__in=scopes).values_list('scope', 'version'))
+    return {scope: stored.get(scope, 0) for scope in scopes}
+
+
+def bump_versions(scopes):
+    CacheVersion.objects.bulk_create([CacheVersion(scope=scope) for scope in scopes], ignore_conflicts=True)
+    CacheVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+
+
+def changed_scopes(changes):
+    """Every scope touched by ``(before, after)`` ticket value pairs"""
+    scopes = set()
+    for before, after in changes:
+        for values in (before, after):
+            if values is not None:
+                scopes |= scopes_for_ticket(values)
+    return scopes
+
+
+def invalidate(scopes):
+    """Bump the stats version of the given scopes once the transaction commits"""
+    # Bumping before commit would let a concurrent read cache old data under
+    # the new version
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def get_cached_stats(scopes, tickets, compute):
+    """
+    Return ``(counts, etag)`` for a role scope, recomputing only on a miss.
+
+    ``scopes`` are the version scopes the figures depend on, ``tickets`` the
+    scoped ticket queryset and ``compute`` a callable returning full stats.
+    Entries are also dropped once the next active ticket in scope falls due,
+    since that changes the overdue count without any ticket being saved.
+    """
+    versions = get_versions(scopes)
+    signature = json.dumps(sorted(versions.items()))
+    key = ENTRY_KEY.format(hashlib.md5(signature.encode()).hexdigest())
+
+    now = timezone.now()
+    entry = cache.get(key)
+    if entry and (entry['valid_until'] is None or now < entry['valid_until']):
+        return entry['counts'], entry['etag']
+
+    counts = summary_counts(compute())
+    valid_until = tickets.filter(
+        status__in=ACTIVE_STATUSES, due_date__gte=now
+    ).aggregate(next_due=Min('due_date'))['next_due']
+    etag = '"{}"'.format(hashlib.md5(json.dumps(counts, sort_keys=True).encode()).hexdigest())
+
+    cache.set(key, {'counts': counts, 'etag': etag, 'valid_until': valid_until}, STATS_CACHE_TTL)
+    return counts, etag
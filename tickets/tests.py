@@ -1,3 +1,994 @@
+import asyncio
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import batch, bulk_actions, exports, numbering, reference_data
+from .backends import ProfileModelBackend
+from .breaches import BREACH_ACTION, scan_breaches
+from .bulk_actions import HISTORY_ACTION, queue_bulk_action, run_bulk_action
+from .counters import counter_ticket_stats
+from .events import DatabaseBroker, LocalBroker
+from .exports import async_chunks, queue_export, run_export_job
+from .performance import agent_scorecards, backfill_performance
+from .permissions import get_role
+from .reporting import ReportExecutor, default_window, get_report
+from .resolution import IntervalSeconds, resolution_report
+from .rollups import backfill_rollups
+from .sla import BusinessCalendar, SLAEngine, recompute_deadlines
+from .staffing import arrival_heatmap, backlog_aging
+from .models import (
+    SLA, AgentDailyPerformance, CacheVersion, Category, DailyTicketRollup, Department, Priority, Ticket, TicketAttachment,
+    TicketComment, TicketCounter, TicketEvent, TicketSequence, UserProfile,
+)
+from .stats import compute_ticket_stats, summary_counts
+
+
+class WorkerKilled(BaseException):
+    """Stands in for a worker process dying, which no ``except`` sees"""
+
+
+class TicketFixtures:
+    """Departments, priorities and users shared by the ticket tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT')
+        cls.hr = Department.objects.create(name='HR')
+        cls.hardware = Category.objects.create(name='Hardware', department=cls.it)
+        cls.payroll = Category.objects.create(name='Payroll', department=cls.hr)
+        cls.low = Priority.objects.create(name='Low', level=1, response_time=24)
+        cls.high = Priority.objects.create(name='High', level=3, response_time=4)
+
+        cls.submitter = cls.make_user('submitter')
+        cls.agent = cls.make_user('agent', department=cls.it, is_agent=True)
+        cls.hr_agent = cls.make_user('hr_agent', department=cls.hr, is_agent=True)
+        cls.supervisor = cls.make_user('supervisor', department=cls.it, is_supervisor=True)
+
+    @classmethod
+    def make_user(cls, username, **profile):
+        user = User.objects.create_user(username, f'{username}@example.com', 'password')
+        UserProfile.objects.create(user=user, **profile)
+        return user
+
+    def setUp(self):
+        cache.clear()
+        # Drop the snapshot of an earlier test's lookup tables
+        reference_data.bump_version()
+
+    def make_ticket(self, department=None, **values):
+        department = department or self.it
+        values.setdefault('category', self.hardware if department == self.it else self.payroll)
+        values.setdefault('priority', self.low)
+        values.setdefault('submitter', self.submitter)
+        values.setdefault('title', 'Cannot log in')
+        values.setdefault('description', 'Since this morning')
+        ticket = Ticket(department=department, **values)
+        ticket.save()
+        return ticket
+
+    def temp_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return directory
+
+
+class TicketStatsTests(TicketFixtures, TestCase):
+
+    def test_counts_come_from_one_grouped_query(self):
+        past = timezone.now() - timedelta(days=1)
+        self.make_ticket()
+        self.make_ticket(status='in_progress', due_date=past)
+        self.make_ticket(self.hr, status='resolved', due_date=past)
+        self.make_ticket(self.hr, priority=self.high)
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = compute_ticket_stats(Ticket.objects.all())
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(summary_counts(stats), {
+            'total': 4, 'open': 2, 'in_progress': 1, 'resolved': 1, 'overdue': 1,
+        })
+        self.assertEqual(
+            [(row['priority__name'], row['count']) for row in stats['priority_stats']],
+            [('Low', 3), ('High', 1)],
+        )
+        self.assertEqual({row['department__name']: row['count'] for row in stats['dept_stats']}, {'IT': 2, 'HR': 2})
+
+    def test_scoped_queryset(self):
+        self.make_ticket()
+        self.make_ticket(self.hr)
+
+        stats = compute_ticket_stats(Ticket.objects.filter(department=self.hr))
+
+        self.assertEqual(stats['total'], 1)
+        self.assertEqual(stats['dept_stats'], [{'department__name': 'HR', 'count': 1}])
+
+
+class TicketCounterTests(TicketFixtures, TestCase):
+
+    def verify(self):
+        call_command('rebuild_ticket_counters', '--verify', stdout=StringIO())
+
+    def test_counters_follow_ticket_changes(self):
+        ticket = self.make_ticket()
+        self.make_ticket(self.hr, assigned_to=self.hr_agent)
+        ticket.status = 'resolved'
+        ticket.assigned_to = self.agent
+        ticket.save()
+        ticket.delete()
+
+        self.verify()
+        self.assertEqual(
+            summary_counts(counter_ticket_stats()),
+            summary_counts(compute_ticket_stats(Ticket.objects.all())),
+        )
+
+    def test_verify_reports_drift(self):
+        self.make_ticket()
+        TicketCounter.objects.update(ticket_count=5)
+
+        with self.assertRaises(CommandError):
+            self.verify()
+        call_command('rebuild_ticket_counters', stdout=StringIO())
+        self.verify()
+
+    def test_row_created_by_a_concurrent_writer_is_incremented(self):
+        key = (self.it.pk, self.agent.pk, self.low.pk, 'open', False)
+        fields = ['department_id', 'assigned_to_id', 'priority_id', 'status', 'is_overdue']
+        TicketCounter.objects.create(**dict(zip(fields, key)), ticket_count=2)
+
+        # The first SELECT runs before the other writer's row is visible
+        real = batch._existing_rows
+        with mock.patch.object(batch, '_existing_rows', side_effect=[{}, real(TicketCounter, fields, [key])]):
+            batch.add_to_rows(TicketCounter, fields, {key: {'ticket_count': 3}})
+
+        self.assertEqual(list(TicketCounter.objects.values_list('ticket_count', flat=True)), [5])
+
+
+class TicketNumberTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        numbering.allocator.reset()
+
+    def test_block_is_reserved_once_and_drawn_down(self):
+        allocator = numbering.TicketNumberAllocator(block_size=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.allocate('TK'), [1])
+
+        self.assertEqual(TicketSequence.objects.get(prefix='TK').next_value, 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate('TK', 3), [2, 3, 4])
+        # Asking past the end of the block reserves a new one for the shortfall
+        self.assertEqual(allocator.allocate('TK', 3), [5, 6, 7])
+        self.assertEqual(TicketSequence.objects.get(prefix='TK').next_value, 11)
+
+    def test_department_prefix_falls_back_to_the_global_one(self):
+        self.it.ticket_prefix = 'IT'
+        self.it.save()
+        numbering.ticket_prefix(self.hr.pk)  # take the reference data snapshot
+        # Created after the snapshot, so its prefix is looked up directly
+        facilities = Department.objects.create(name='Facilities', ticket_prefix='FAC')
+
+        self.assertEqual(self.make_ticket().ticket_number, 'IT00000001')
+        self.assertEqual(self.make_ticket(self.hr).ticket_number, 'TK00000001')
+        self.assertEqual(numbering.next_ticket_number(facilities.pk), 'FAC00000001')
+
+    def test_new_sequence_starts_past_existing_numbers(self):
+        ticket = self.make_ticket()
+        Ticket.objects.filter(pk=ticket.pk).update(ticket_number='TK00000041')
+        self.make_ticket(ticket_number='TKLEGACY')
+        TicketSequence.objects.all().delete()
+        numbering.allocator.reset()
+
+        self.assertEqual(numbering.next_ticket_number(self.it.pk), 'TK00000042')
+
+    def test_assign_ticket_numbers_reserves_once_per_prefix(self):
+        self.hr.ticket_prefix = 'HR'
+        self.hr.save()
+        tickets = [
+            Ticket(department=department, category=category, priority=self.low, submitter=self.submitter, title='New')
+            for department, category in [(self.it, self.hardware), (self.hr, self.payroll), (self.it, self.hardware)]
+        ]
+        tickets.append(Ticket(ticket_number='KEEP0001', department=self.it, category=self.hardware,
+                              priority=self.low, submitter=self.submitter, title='Numbered'))
+        numbering.ticket_prefix(self.it.pk)  # load the reference data first
+
+        with CaptureQueriesContext(connection) as queries:
+            numbering.assign_ticket_numbers(tickets)
+        Ticket.objects.bulk_create(tickets)
+
+        self.assertEqual(
+            [ticket.ticket_number for ticket in tickets],
+            ['TK00000001', 'HR00000001', 'TK00000002', 'KEEP0001'],
+        )
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+
+    def test_workers_never_issue_the_same_number(self):
+        workers = [numbering.TicketNumberAllocator(block_size=3) for _ in range(2)]
+        issued = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                for worker in workers:
+                    issued.extend(worker.allocate('TK'))
+        issued.extend(workers[0].allocate('TK', 4))
+
+        self.assertEqual(len(issued), len(set(issued)))
+        self.assertLess(max(issued), TicketSequence.objects.get(prefix='TK').next_value)
+
+
+class TicketStatsCacheTests(TicketFixtures, TestCase):
+
+    def test_ticket_change_invalidates_every_worker(self):
+        self.make_ticket()
+        self.client.force_login(self.supervisor)
+        response = self.client.get('/ajax/stats/')
+        etag = response['ETag']
+        self.assertEqual(response.json()['total'], 1)
+        self.assertEqual(self.client.get('/ajax/stats/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_ticket(self.hr)
+
+        # The bump is stored in the database, where other workers read it
+        self.assertEqual(CacheVersion.objects.get(scope='all').version, 1)
+        response = self.client.get('/ajax/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 2)
+
+
+class RollupMigrationTests(TicketFixtures, TestCase):
+
+    def rollups(self):
+        return sorted(DailyTicketRollup.objects.values_list(
+            'day', 'department_id', 'priority_id', 'status', 'assigned_to_id',
+            'created_count', 'resolved_count', 'closed_count', 'resolution_count', 'resolution_time',
+        ))
+
+    def test_migration_fills_the_rollups_existing_tickets_need(self):
+        now = timezone.now()
+        self.make_ticket(created_at=now - timedelta(days=3))
+        self.make_ticket(self.hr, assigned_to=self.hr_agent, created_at=now - timedelta(days=2),
+                         status='resolved', resolved_at=now - timedelta(days=1))
+        self.make_ticket(created_at=now - timedelta(days=5), status='closed',
+                         resolved_at=now - timedelta(days=4), closed_at=now)
+        backfill_rollups()
+        expected = self.rollups()
+        self.assertEqual(len(expected), 6)
+
+        DailyTicketRollup.objects.all().delete()
+        migration = import_module('tickets.migrations.0004_daily_ticket_rollups')
+        migration.build_rollups(apps, None)
+
+        self.assertEqual(self.rollups(), expected)
+
+
+class ReportCacheTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+        # Low priority allows 24 hours, so this one fell due six days ago
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket = self.make_ticket(created_at=self.now - timedelta(days=7))
+
+    def past_report(self):
+        return get_report(self.today - timedelta(days=10), self.today - timedelta(days=5))
+
+    def test_past_report_follows_status_changes(self):
+        report, timings = self.past_report()
+        self.assertEqual((report['resolved_tickets'], report['overdue_tickets']), (0, 1))
+        self.assertEqual(self.past_report()[1], 'cache;desc=hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket.status = 'resolved'
+            self.ticket.save()
+
+        report, timings = self.past_report()
+        self.assertNotEqual(timings, 'cache;desc=hit')
+        self.assertEqual((report['resolved_tickets'], report['overdue_tickets']), (1, 0))
+
+    def test_past_report_follows_breach_scan(self):
+        self.assertEqual(self.past_report()[0]['breached_tickets'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            scan_breaches(self.now)
+
+        self.assertEqual(self.past_report()[0]['breached_tickets'], 1)
+
+    def test_report_expires_when_a_deadline_passes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_ticket(created_at=self.now - timedelta(hours=23))
+        window = (self.today - timedelta(days=1), self.today)
+
+        self.assertEqual(get_report(*window)[0]['overdue_tickets'], 0)
+        self.assertEqual(get_report(*window)[1], 'cache;desc=hit')
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(hours=2)):
+            report, timings = get_report(*window)
+        self.assertNotEqual(timings, 'cache;desc=hit')
+        self.assertEqual(report['overdue_tickets'], 1)
+
+
+class WarmReportCacheTests(TicketFixtures, TestCase):
+
+    def test_refuses_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'not shared with the web workers'):
+            call_command('warm_report_cache', stdout=StringIO())
+
+    def test_warms_a_shared_cache(self):
+        self.make_ticket()
+        shared = {
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.temp_dir()},
+        }
+
+        with self.settings(CACHES=shared):
+            call_command('warm_report_cache', stdout=StringIO())
+            report, timings = get_report(*default_window())
+        self.assertEqual((report['total_tickets'], timings), (1, 'cache;desc=hit'))
+
+
+class ReportScopeTests(TicketFixtures, TestCase):
+
+    def report(self, user):
+        self.client.force_login(user)
+        response = self.client.get('/reports/')
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def test_reports_are_scoped_to_the_department(self):
+        ticket = self.make_ticket(assigned_to=self.agent, status='resolved')
+        self.make_ticket(self.hr)
+
+        self.assertEqual(self.report(self.supervisor)['total_tickets'], 2)
+        context = self.report(self.agent)
+        self.assertEqual(context['total_tickets'], 1)
+        self.assertEqual([card['agent_id'] for card in context['agent_stats']], [ticket.assigned_to_id])
+
+    def test_agent_without_department_sees_an_empty_report(self):
+        self.make_ticket(assigned_to=self.agent, status='resolved')
+        loner = self.make_user('loner', is_agent=True)
+
+        context = self.report(loner)
+        self.assertEqual((context['total_tickets'], context['agent_stats']), (0, []))
+        self.assertEqual(context['backlog']['departments'], [])
+        self.assertEqual(context['resolution']['overall']['count'], 0)
+
+
+class StaffingTests(TicketFixtures, TestCase):
+
+    def test_aging_brackets_are_open_below_and_closed_above(self):
+        now = timezone.now()
+        for age in [
+            timedelta(days=1) - timedelta(seconds=1), timedelta(days=1),
+            timedelta(days=3), timedelta(days=7),
+            timedelta(days=30) - timedelta(seconds=1), timedelta(days=30), timedelta(days=400),
+        ]:
+            self.make_ticket(created_at=now - age)
+        self.make_ticket(self.hr, created_at=now)
+        self.make_ticket(self.hr, created_at=now - timedelta(days=400), status='resolved')
+
+        aging = backlog_aging(now=now)
+
+        self.assertEqual(aging['labels'], ['0–1d', '1–3d', '3–7d', '7–30d', '30d+'])
+        self.assertEqual(aging['departments'], [
+            {'name': 'IT', 'counts': [1, 1, 1, 2, 2], 'total': 7},
+            {'name': 'HR', 'counts': [1, 0, 0, 0, 0], 'total': 1},
+        ])
+
+    def test_heatmap_buckets_by_local_weekday_and_hour(self):
+        utc = dt_timezone.utc
+        # Sunday evening in UTC is Monday morning in Tokyo (UTC+9)
+        self.make_ticket(created_at=datetime(2026, 10, 11, 20, 30, tzinfo=utc))
+        self.make_ticket(created_at=datetime(2026, 10, 11, 20, 59, tzinfo=utc))
+        self.make_ticket(created_at=datetime(2026, 10, 12, 0, 10, tzinfo=utc))
+        # Monday in UTC but already Tuesday in Tokyo, outside the range
+        self.make_ticket(created_at=datetime(2026, 10, 12, 15, 0, tzinfo=utc))
+
+        with timezone.override('Asia/Tokyo'):
+            heatmap = arrival_heatmap(date(2026, 10, 12), date(2026, 10, 12))
+
+        busy = {
+            (row['day'], cell['hour']): (cell['count'], cell['level'])
+            for row in heatmap['rows'] for cell in row['cells'] if cell['count']
+        }
+        self.assertEqual(heatmap['peak'], 2)
+        self.assertEqual(busy, {('Mon', 5): (2, 100), ('Mon', 9): (1, 50)})
+        self.assertEqual([row['day'] for row in heatmap['rows']], ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+
+
+class TicketSearchTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.in_description = self.make_ticket(title='Monitor flickers', description='Also the printer is jammed')
+        self.in_title = self.make_ticket(title='Printer offline', description='Since Monday')
+        self.unrelated = self.make_ticket(title='Password reset', description='Locked out')
+        TicketComment.objects.create(
+            ticket=self.unrelated, author=self.agent, comment='printer driver reinstalled', is_internal=True,
+        )
+
+    def search(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get('/tickets/', {'search': 'printer', **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertRanked(self, tickets):
+        # Title matches weigh the most
+        self.assertEqual(tickets[0], self.in_title)
+        self.assertEqual(set(tickets), {self.in_title, self.in_description, self.unrelated})
+
+    def test_results_are_ranked(self):
+        response = self.search(self.agent)
+        self.assertRanked(list(response.context['tickets']))
+
+    def test_internal_notes_are_only_matched_for_staff(self):
+        response = self.search(self.submitter)
+        self.assertEqual(list(response.context['tickets']), [self.in_title, self.in_description])
+
+    def test_cursor_mode_keeps_the_ranking(self):
+        response = self.search(self.agent, pagination='cursor')
+        self.assertFalse(response.context['cursor_pagination'])
+        self.assertRanked(list(response.context['tickets']))
+
+    def test_cursor_pages_without_search(self):
+        self.client.force_login(self.agent)
+        with self.settings(TICKET_LIST_PAGINATION='cursor'):
+            response = self.client.get('/tickets/')
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertEqual(list(response.context['tickets']), [self.unrelated, self.in_title, self.in_description])
+
+
+class TicketActivityTests(TicketFixtures, TestCase):
+
+    def verify(self):
+        call_command('reconcile_ticket_activity', '--verify', stdout=StringIO())
+
+    def test_activity_follows_comments_and_attachments(self):
+        ticket = self.make_ticket()
+        public = TicketComment.objects.create(ticket=ticket, author=self.agent, comment='Rebooted', is_internal=False)
+        TicketComment.objects.create(ticket=ticket, author=self.agent, comment='Needs a part', is_internal=True)
+        with self.settings(MEDIA_ROOT=self.temp_dir()):
+            attachment = TicketAttachment(ticket=ticket, uploaded_by=self.agent)
+            attachment.file.save('log.txt', ContentFile(b'log'), save=False)
+            attachment.save()
+
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.comment_count, ticket.attachment_count), (2, 1))
+        self.assertEqual(ticket.last_public_comment_at, public.created_at)
+        self.assertEqual(ticket.last_activity_at, attachment.uploaded_at)
+        self.verify()
+
+        attachment.delete()
+        public.delete()
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.comment_count, ticket.attachment_count), (1, 0))
+        self.assertIsNone(ticket.last_public_comment_at)
+        self.verify()
+
+    def test_verify_reports_stale_columns(self):
+        ticket = self.make_ticket()
+        TicketComment.objects.create(ticket=ticket, author=self.agent, comment='Rebooted', is_internal=False)
+        Ticket.objects.filter(pk=ticket.pk).update(comment_count=7)
+
+        with self.assertRaises(CommandError):
+            self.verify()
+        call_command('reconcile_ticket_activity', stdout=StringIO())
+        self.verify()
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.comment_count, 1)
+
+
+class TicketEventTests(TicketFixtures, TestCase):
+
+    def test_local_broker_delivers_to_subscribers_of_the_channel(self):
+        broker = LocalBroker()
+
+        async def listen():
+            async with broker.subscribe(['ticket:1']) as subscription:
+                # Publishers run in sync worker threads
+                await sync_to_async(broker.publish, thread_sensitive=False)('ticket:2', {'id': 2})
+                await sync_to_async(broker.publish, thread_sensitive=False)('ticket:1', {'id': 1})
+                received = [await subscription.get(1), await subscription.get(0.05)]
+            return received
+
+        self.assertEqual(async_to_sync(listen)(), [('ticket:1', {'id': 1}), None])
+        self.assertEqual(dict(broker._subscriptions), {})
+
+    def test_database_broker_relays_new_rows_and_prunes_old_ones(self):
+        stale = TicketEvent.objects.create(channel='ticket:1', payload={'id': 0})
+        TicketEvent.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        broker = DatabaseBroker()
+        broker.poll_interval = 0
+
+        async def listen():
+            async with broker.subscribe(['ticket:1']) as subscription:
+                # Rows from before the subscription are not replayed
+                first = await subscription.get(0.05)
+                await sync_to_async(broker.publish)('ticket:1', {'id': 1})
+                received = await subscription.get(1)
+                for _ in range(100):
+                    if not await TicketEvent.objects.filter(pk=stale.pk).aexists():
+                        break
+                    await asyncio.sleep(0.01)
+            broker._poller.cancel()
+            return first, received
+
+        self.assertEqual(async_to_sync(listen)(), (None, ('ticket:1', {'id': 1})))
+        self.assertEqual(list(TicketEvent.objects.values_list('payload', flat=True)), [{'id': 1}])
+
+
+class ReportExecutorTests(TicketFixtures, TestCase):
+
+    SECTIONS = {
+        'total': (sum, [1, 2, 3]),
+        'sorted': (sorted, 'report'),
+        'joined': (', '.join, ['IT', 'HR']),
+    }
+
+    def test_sequential_fallback_returns_the_same_sections(self):
+        concurrent = ReportExecutor(concurrent=True)
+        sequential = ReportExecutor(concurrent=False)
+
+        self.assertEqual(concurrent.run(self.SECTIONS), sequential.run(self.SECTIONS))
+        self.assertEqual(list(concurrent.timings), list(sequential.timings))
+        self.assertEqual(sequential.run(self.SECTIONS)['sorted'], ['e', 'o', 'p', 'r', 'r', 't'])
+
+    def test_sections_stay_on_the_connection_inside_a_transaction(self):
+        # Other connections can't see this test's uncommitted tickets
+        self.make_ticket()
+        executor = ReportExecutor()
+
+        sections = executor.run({'count': (Ticket.objects.count,)})
+
+        self.assertFalse(executor.concurrent)
+        self.assertEqual(sections, {'count': 1})
+
+
+class TicketHistoryTests(TicketFixtures, TestCase):
+
+    def test_update_under_asgi_is_attributed(self):
+        ticket = self.make_ticket()
+
+        async def update():
+            await self.async_client.aforce_login(self.agent)
+            return await self.async_client.post(f'/tickets/{ticket.pk}/update/', {
+                'title': ticket.title, 'description': ticket.description, 'department': self.it.pk,
+                'category': self.hardware.pk, 'priority': self.low.pk, 'status': 'in_progress',
+            })
+
+        self.assertEqual(async_to_sync(update)().status_code, 302)
+        entry = ticket.history.get(field_changed='status')
+        self.assertEqual((entry.new_value, entry.user), ('In Progress', self.agent))
+
+
+class BulkActionTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tickets = [self.make_ticket() for number in range(5)]
+        self.ids = [ticket.pk for ticket in self.tickets]
+
+    def bulk_history(self, ticket):
+        return list(ticket.history.filter(action=HISTORY_ACTION).values_list('field_changed', 'new_value', 'user'))
+
+    def test_chunks_skips_and_unchanged_tickets(self):
+        hr_ticket = self.make_ticket(self.hr)
+        self.tickets[0].status = 'in_progress'
+        self.tickets[0].save()
+
+        stats = run_bulk_action(
+            'status', {'status': 'in_progress'}, [*self.ids, hr_ticket.pk], user_id=self.agent.pk,
+            scope=get_role(self.agent).visible_q(), chunk_size=2,
+        )
+
+        self.assertEqual(
+            {key: stats[key] for key in ['selected', 'updated', 'unchanged', 'skipped', 'history_rows', 'chunks']},
+            {'selected': 6, 'updated': 4, 'unchanged': 1, 'skipped': 1, 'history_rows': 4, 'chunks': 3},
+        )
+        self.assertEqual(Ticket.objects.filter(status='in_progress').count(), 5)
+        self.assertEqual(self.bulk_history(self.tickets[0]), [])
+        for ticket in self.tickets[1:]:
+            self.assertEqual(self.bulk_history(ticket), [('status', 'In Progress', self.agent.pk)])
+        self.assertEqual(Ticket.objects.get(pk=hr_ticket.pk).status, 'open')
+
+    def test_interrupted_job_resumes_after_its_last_chunk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = queue_bulk_action(self.supervisor, 'status', {'status': 'pending'}, self.ids)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+        run_chunk = bulk_actions._run_chunk
+        calls = []
+
+        def dying_run_chunk(*args):
+            run_chunk(*args)
+            calls.append(args)
+            if len(calls) == 2:
+                # The chunk committed, its progress never did
+                raise WorkerKilled
+
+        with mock.patch('tickets.bulk_actions._run_chunk', dying_run_chunk), self.assertRaises(WorkerKilled):
+            bulk_actions.run_job(job.pk, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('running', 2))
+
+        call_command('process_bulk_actions', '--resume', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('done', 5))
+        self.assertEqual((job.stats['updated'], job.stats['unchanged']), (1, 2))
+        self.assertEqual(Ticket.objects.filter(status='pending').count(), 5)
+        for ticket in self.tickets:
+            self.assertEqual(self.bulk_history(ticket), [('status', 'Pending', self.supervisor.pk)])
+
+
+class TicketAccessTests(TicketFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.stranger = cls.make_user('stranger')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def rights(self, user, ticket):
+        role = get_role(user)
+        return role.can_edit(ticket), role.can_comment(ticket), role.can_upload(ticket)
+
+    def test_access_matrix(self):
+        it_ticket = self.make_ticket()
+        hr_ticket = self.make_ticket(self.hr)
+        assigned = self.make_ticket(self.hr, assigned_to=self.agent)
+        own_hr_ticket = self.make_ticket(self.hr, submitter=self.agent)
+
+        matrix = [
+            (self.supervisor, hr_ticket, (True, True, True)),
+            (self.agent, it_ticket, (True, True, True)),
+            (self.agent, assigned, (True, True, True)),
+            (self.agent, hr_ticket, (False, False, False)),
+            # Agents keep commenting on their own tickets, not editing them
+            (self.agent, own_hr_ticket, (False, True, True)),
+            (self.submitter, it_ticket, (True, True, True)),
+            (self.stranger, it_ticket, (False, False, False)),
+            # Superusers get no rights beyond their profile
+            (self.admin, it_ticket, (False, False, False)),
+        ]
+        for user, ticket, expected in matrix:
+            with self.subTest(user=user.username, ticket=ticket.title):
+                self.assertEqual(self.rights(user, ticket), expected)
+
+    def test_views_follow_the_rules(self):
+        own_hr_ticket = self.make_ticket(self.hr, submitter=self.agent)
+        self.client.force_login(self.agent)
+
+        self.assertEqual(self.client.get(f'/tickets/{own_hr_ticket.pk}/update/').status_code, 403)
+        response = self.client.post(
+            f'/tickets/{own_hr_ticket.pk}/comment/', {'comment': 'Any news?'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.hr_agent)
+        self.assertEqual(self.client.get(f'/tickets/{own_hr_ticket.pk}/update/').status_code, 200)
+
+
+class RoleTests(TicketFixtures, TestCase):
+
+    def test_role_of_the_session_user_needs_no_queries(self):
+        user = ProfileModelBackend().get_user(self.agent.pk)
+        with self.assertNumQueries(0):
+            role = get_role(user)
+        self.assertEqual((role.kind, role.department_id), ('agent', self.it.pk))
+
+    def test_profile_change_applies_on_the_next_request(self):
+        ticket = self.make_ticket()
+        self.client.force_login(self.agent)
+        self.assertEqual(self.client.get(f'/tickets/{ticket.pk}/update/').status_code, 200)
+
+        profile = UserProfile.objects.get(user=self.agent)
+        profile.department = self.hr
+        profile.save()
+
+        self.assertEqual(self.client.get(f'/tickets/{ticket.pk}/update/').status_code, 403)
+
+
+class BusinessCalendarTests(TicketFixtures, TestCase):
+
+    HOURS = {weekday: ('09:00', '17:00') for weekday in range(5)}
+
+    def local(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_friday_evening_rolls_into_monday(self):
+        calendar = BusinessCalendar(self.HOURS)
+        # Friday 16 October 2026, one working hour before closing
+        friday = self.local(2026, 10, 16, 16, 0)
+
+        self.assertEqual(calendar.add_hours(friday, 1), self.local(2026, 10, 16, 17, 0))
+        self.assertEqual(calendar.add_hours(friday, 3), self.local(2026, 10, 19, 11, 0))
+        # After closing, nothing accrues until Monday's opening
+        self.assertEqual(calendar.add_hours(self.local(2026, 10, 16, 20, 0), 2), self.local(2026, 10, 19, 11, 0))
+
+    def test_holiday_is_skipped(self):
+        calendar = BusinessCalendar(self.HOURS, holidays=['2026-10-19', date(2026, 10, 20)])
+
+        self.assertEqual(
+            calendar.add_hours(self.local(2026, 10, 16, 16, 0), 3),
+            self.local(2026, 10, 21, 11, 0),
+        )
+
+    def test_start_before_opening_waits_for_it(self):
+        calendar = BusinessCalendar(self.HOURS)
+
+        self.assertEqual(calendar.add_hours(self.local(2026, 10, 14, 6, 30), 2), self.local(2026, 10, 14, 11, 0))
+        self.assertEqual(calendar.add_hours(self.local(2026, 10, 14, 6, 30), 8), self.local(2026, 10, 14, 17, 0))
+
+    def test_holidays_alone_stop_the_clock(self):
+        calendar = BusinessCalendar(holidays=['2026-10-17'])
+
+        self.assertEqual(
+            calendar.add_hours(self.local(2026, 10, 16, 22, 0), 4),
+            self.local(2026, 10, 18, 2, 0),
+        )
+
+    def test_hours_that_close_before_opening_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            BusinessCalendar({0: ('17:00', '09:00')})
+
+    def test_engine_sets_deadlines_on_the_calendar(self):
+        SLA.objects.create(name='IT High', department=self.it, priority=self.high, response_time=2, resolution_time=10)
+        reference_data.bump_version()
+        engine = SLAEngine(BusinessCalendar(self.HOURS))
+        ticket = Ticket(department=self.it, priority=self.high, created_at=self.local(2026, 10, 16, 16, 0))
+
+        engine.apply(ticket)
+
+        self.assertEqual(ticket.response_due_at, self.local(2026, 10, 19, 10, 0))
+        self.assertEqual(ticket.resolution_due_at, self.local(2026, 10, 20, 10, 0))
+        self.assertEqual(ticket.due_date, ticket.resolution_due_at)
+
+        # A hand-set due date survives a priority change; the SLA deadlines move
+        manual = self.local(2026, 10, 30, 12, 0)
+        ticket.due_date = manual
+        previous = {'department_id': self.it.pk, 'priority_id': self.high.pk}
+        ticket.priority = self.low
+        engine.apply(ticket, previous)
+
+        self.assertEqual(ticket.response_due_at, self.local(2026, 10, 21, 16, 0))
+        self.assertEqual(ticket.due_date, manual)
+
+        # Saving without moving department or priority leaves them alone
+        ticket.response_due_at = None
+        engine.apply(ticket, {'department_id': self.it.pk, 'priority_id': self.low.pk})
+        self.assertIsNone(ticket.response_due_at)
+
+
+class BreachTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        # Low priority allows 24 hours, so this one fell due 6 hours ago
+        self.late = self.make_ticket(created_at=self.now - timedelta(hours=30))
+        self.on_time = self.make_ticket(created_at=self.now - timedelta(hours=1))
+
+    def breaches(self, ticket):
+        return list(ticket.history.filter(action=BREACH_ACTION).values_list('new_value', flat=True))
+
+    def set_resolution_hours(self, hours):
+        SLA.objects.create(name='IT Low', department=self.it, priority=self.low, response_time=1, resolution_time=hours)
+        reference_data.bump_version()
+        recompute_deadlines()
+        self.late.refresh_from_db()
+
+    def test_scanner_stamps_the_due_date_once(self):
+        self.assertEqual(scan_breaches(self.now), 1)
+        self.assertEqual(scan_breaches(self.now), 0)
+
+        self.late.refresh_from_db()
+        self.on_time.refresh_from_db()
+        self.assertEqual(self.late.breached_at, self.late.due_date)
+        self.assertIsNone(self.on_time.breached_at)
+        self.assertEqual(len(self.breaches(self.late)), 1)
+
+    def test_deadline_moved_into_the_future(self):
+        scan_breaches(self.now)
+        self.set_resolution_hours(48)
+
+        self.assertEqual(self.late.due_date, self.late.created_at + timedelta(hours=48))
+        self.assertIsNone(self.late.breached_at)
+        self.assertEqual(scan_breaches(self.now), 0)
+
+        # Once the new deadline passes, the breach is stamped and recorded again
+        self.assertEqual(scan_breaches(self.now + timedelta(hours=19)), 1)
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.breached_at, self.late.due_date)
+        self.assertEqual(len(self.breaches(self.late)), 2)
+
+    def test_deadline_moved_within_the_past(self):
+        scan_breaches(self.now)
+        self.set_resolution_hours(27)
+
+        self.assertIsNone(self.late.breached_at)
+        self.assertEqual(scan_breaches(self.now), 1)
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.breached_at, self.late.created_at + timedelta(hours=27))
+
+    def test_ticket_finished_late_is_stamped_on_save(self):
+        self.late.status = 'resolved'
+        self.late.save()
+
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.breached_at, self.late.due_date)
+        self.assertEqual(len(self.breaches(self.late)), 1)
+        self.assertEqual(scan_breaches(self.now), 0)
+
+
+class TicketExportTests(TicketFixtures, TestCase):
+
+    def test_streams_under_asgi(self):
+        first = self.make_ticket(title='Printer jam')
+        second = self.make_ticket(title='VPN drops')
+        self.client.force_login(self.supervisor)
+        expected = self.client.get('/reports/export/').getvalue()
+
+        async def download():
+            await self.async_client.aforce_login(self.supervisor)
+            response = await self.async_client.get('/reports/export/')
+            return response, [piece async for piece in response.streaming_content]
+
+        # A piece per row, each pulled in turn rather than read up front
+        with mock.patch('tickets.exports.EXPORT_BUFFER_SIZE', 1):
+            response, pieces = async_to_sync(download)()
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(pieces), 2)
+        self.assertEqual(b''.join(pieces), expected)
+        self.assertIn(first.ticket_number.encode(), expected)
+        self.assertIn(second.ticket_number.encode(), expected)
+
+    def test_async_chunks_are_pulled_lazily(self):
+        pulled = []
+
+        def chunks():
+            for piece in (b'a', b'b', b'c'):
+                pulled.append(piece)
+                yield piece
+
+        async def read_one(stream):
+            async for piece in stream:
+                return piece
+
+        stream = chunks()
+        self.assertEqual(async_to_sync(read_one)(async_chunks(stream)), b'a')
+        self.assertEqual(pulled, [b'a'])
+
+
+class ExportJobTests(TicketFixtures, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = self.settings(MEDIA_ROOT=self.temp_dir())
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.tickets = [self.make_ticket(title=f'Ticket {number}') for number in range(5)]
+
+    def lines(self, job):
+        job.refresh_from_db()
+        with job.file.open('rb') as export:
+            return export.read().decode().splitlines()
+
+    def test_web_worker_leaves_the_job_to_the_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job, created = queue_export(self.supervisor, 'csv', {})
+        job.refresh_from_db()
+        self.assertEqual((created, job.status, job.rows_written), (True, 'pending', 0))
+
+        call_command('process_export_jobs', stdout=StringIO())
+        self.assertEqual(len(self.lines(job)), 6)
+        self.assertEqual((job.status, job.rows_written, job.total), ('done', 5, 5))
+
+    def test_interrupted_job_resumes_after_its_checkpoint(self):
+        job, created = queue_export(self.supervisor, 'csv', {})
+        append = exports._append
+        chunks = []
+
+        def dying_append(out, job, data, chunk):
+            append(out, job, data, chunk)
+            if chunk:
+                chunks.append(chunk)
+            if len(chunks) == 2:
+                # Written after the checkpoint, then lost with the worker
+                out.write(b'half a row')
+                raise WorkerKilled
+
+        with mock.patch('tickets.exports._append', dying_append), self.assertRaises(WorkerKilled):
+            run_export_job(job.pk, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), ('running', 4))
+
+        # Only --resume takes over jobs a dead worker left running
+        call_command('process_export_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+
+        call_command('process_export_jobs', '--resume', stdout=StringIO())
+        lines = self.lines(job)
+        self.assertEqual((job.status, job.rows_written), ('done', 5))
+        self.assertEqual(lines[0].split(',')[0], 'Ticket Number')
+        self.assertEqual(
+            sorted(line.split(',')[0] for line in lines[1:]),
+            sorted(ticket.ticket_number for ticket in self.tickets),
+        )
+        self.assertNotIn('half a row', '\n'.join(lines))
+
+
+class ResolutionReportTests(TicketFixtures, TestCase):
+
+    def test_percentiles_of_unordered_tickets(self):
+        now = timezone.now()
+        for hours in [10, 1, 3, 2]:
+            created_at = now - timedelta(days=1)
+            self.make_ticket(created_at=created_at, status='resolved', resolved_at=created_at + timedelta(hours=hours))
+
+        today = timezone.localdate()
+        overall = resolution_report(today - timedelta(days=2), today)['overall']
+
+        self.assertEqual(overall['count'], 4)
+        self.assertEqual(overall['mean_hours'], 4.0)
+        self.assertEqual((overall['p50_hours'], overall['p90_hours'], overall['p99_hours']), (2.5, 7.9, 9.8))
+
+    def test_mysql_interval_subtracts_the_start(self):
+        query = Ticket.objects.annotate(seconds=IntervalSeconds(F('resolved_at'), F('created_at'))).query
+        sql, params = query.annotations['seconds'].as_mysql(query.get_compiler(connection=connection), connection)
+        # TIMESTAMPDIFF(MICROSECOND, start, end) counts from start to end
+        self.assertTrue(sql.startswith('(TIMESTAMPDIFF(MICROSECOND, '))
+        self.assertLess(sql.index('created_at'), sql.index('resolved_at'))
+
+
+class AgentScorecardTests(TicketFixtures, TestCase):
+
+    def resolved(self, department):
+        today = timezone.localdate()
+        return {card['agent_id']: card['resolved'] for card in agent_scorecards(today, today, department.pk)}
+
+    def rows(self):
+        return sorted(AgentDailyPerformance.objects.values_list('day', 'agent_id', 'department_id', 'resolved_count'))
+
+    def test_department_scorecards_follow_the_tickets(self):
+        ticket = self.make_ticket(self.hr, assigned_to=self.agent)
+        ticket.status = 'resolved'
+        ticket.save()
+        self.assertEqual((self.resolved(self.hr), self.resolved(self.it)), ({self.agent.pk: 1}, {}))
+
+        # The agent moving on doesn't take their past work along
+        UserProfile.objects.filter(user=self.agent).update(department=self.hr)
+        UserProfile.objects.filter(user=self.hr_agent).update(department=self.it)
+        self.assertEqual((self.resolved(self.hr), self.resolved(self.it)), ({self.agent.pk: 1}, {}))
+
+        ticket.department = self.it
+        ticket.category = self.hardware
+        ticket.save()
+        self.assertEqual((self.resolved(self.hr), self.resolved(self.it)), ({}, {self.agent.pk: 1}))
 
-# Create your tests here.
+        rows = [row for row in self.rows() if row[3]]
+        backfill_performance()
+        self.assertEqual(self.rows(), rows)
@@ -0,0 +1,41 @@
+from . import counters, performance, rollups, stats_cache
+from .events import publish_on_commit
+
+
+# Ticket fields read by the counters, daily rollups, agent scorecards and
+# stats cache scopes
+TRACKED_FIELDS = [
+    'department_id', 'assigned_to_id', 'submitter_id', 'priority_id', 'status',
+    'due_date', 'created_at', 'resolved_at', 'closed_at', 'first_response_at', 'first_responder_id',
+]
+
+
+def ticket_values(ticket):
+    return {field: getattr(ticket, field) for field in TRACKED_FIELDS}
+
+
+def record_changes(changes):
+    """Feed ``(before, after)`` ticket value pairs to every denormalized table"""
+    counters.record_changes(changes)
+    rollups.record_changes(changes)
+    performance.record_changes(changes)
+
+    scopes = stats_cache.changed_scopes(changes)
+    stats_cache.invalidate(scopes)
+    for scope in scopes:
+        publish_on_commit(f'stats:{scope}', {'scope': scope})
+
+
+def record_ticket_save(previous, ticket):
+    record_changes([(previous, ticket_values(ticket))])
+
+
+def record_ticket_delete(ticket):
+    record_changes([(ticket_values(ticket), None)])
+
+
+def record_agent_delete(user_id):
+    counters.reassign_counters(user_id)
+    rollups.reassign_rollups(user_id)
+    performance.forget_agent(user_id)
+
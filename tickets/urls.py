@@ -20,6 +20,8 @@ urlpatterns = [
     path('tickets/<int:pk>/comment/', views.add_ticket_comment, name='add_ticket_comment'),
     path('tickets/<int:pk>/upload/', views.upload_ticket_attachment, name='upload_ticket_attachment'),
     path('tickets/bulk/', views.bulk_ticket_actions, name='bulk_ticket_actions'),
+    path('ajax/bulk-jobs/<int:pk>/', views.bulk_action_status, name='bulk_action_status'),
+    path('ajax/export-jobs/<int:pk>/', views.export_job_status, name='export_job_status'),
     path('ajax/get-categories/', views.get_categories_by_department, name='get_categories_by_department'),
 
     # Knowledge Base
@@ -32,10 +34,16 @@ urlpatterns = [
     # Reports & Analytics
     path('reports/', views.ReportsView.as_view(), name='reports'),
     path('reports/export/', views.export_tickets_csv, name='export_tickets_csv'),
+    path('reports/export/jobs/', views.queue_ticket_export, name='queue_ticket_export'),
+    path('reports/export/jobs/<int:pk>/download/', views.download_ticket_export, name='download_ticket_export'),
 
     # Profile
     path('profile/', views.UserProfileView.as_view(), name='profile'),
 
     # AJAX / Utilities
     path('ajax/stats/', views.get_ticket_stats, name='get_ticket_stats'),
+
+    # Live updates (server-sent events)
+    path('events/stats/', views.ticket_stats_stream, name='ticket_stats_stream'),
+    path('events/tickets/<int:pk>/comments/', views.ticket_comment_stream, name='ticket_comment_stream'),
 ]
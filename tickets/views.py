@@ -1,13 +1,15 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg, F
-from django.http import JsonResponse, Http404, HttpResponse
+from django.db.models import Q, Avg, F
+from django.http import JsonResponse, Http404, HttpResponse, StreamingHttpResponse, FileResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import reverse_lazy, reverse
-from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, 
@@ -15,13 +17,23 @@ from django.views.generic import (
 )
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login as auth_login, logout
 from django.views import View
 from .models import *
 from .forms import *
+from .counters import counter_ticket_stats
+from .pagination import CursorPaginator, InvalidCursor
+from .permissions import get_role
+from .reference_data import get_reference_data
+from .events import comment_payload, format_sse, get_broker
+from .exports import async_chunks, csv_chunks, export_rows, filter_params, queue_export
+from .bulk_actions import BULK_ACTION_BACKGROUND_THRESHOLD, action_values, queue_bulk_action, run_bulk_action
+from .reporting import default_window, get_backlog, get_report
+from .stats import ALL_DEPARTMENTS, compute_ticket_stats, summary_counts
+from .stats_cache import get_cached_stats
 
 def logout_view(request):
     logout(request)
@@ -63,48 +75,39 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         tickets = Ticket.objects.select_related('submitter', 'assigned_to', 'priority', 'department')
         
         # Filter based on user role
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_agent or user.userprofile.is_supervisor:
-                # Agents see all tickets in their department or assigned to them
-                tickets = tickets.filter(
-                    Q(assigned_to=user) | 
-                    Q(department=user.userprofile.department)
-                )
-            else:
-                # Regular users see only their tickets
-                tickets = tickets.filter(submitter=user)
+        role = self.request.role
+        counter_scope = None
+        if role.is_staff_member:
+            # Agents see all tickets in their department or assigned to them
+            counter_scope = Q(assigned_to=user) | Q(department_id=role.department_id)
+            tickets = tickets.filter(counter_scope)
         else:
+            # Regular users see only their tickets
             tickets = tickets.filter(submitter=user)
         
-        # Statistics
+        # Statistics (counters are not bucketed by submitter)
+        if counter_scope is not None:
+            stats = counter_ticket_stats(counter_scope)
+        else:
+            stats = compute_ticket_stats(tickets)
+        counts = summary_counts(stats)
         context.update({
-            'total_tickets': tickets.count(),
-            'open_tickets': tickets.filter(status='open').count(),
-            'in_progress_tickets': tickets.filter(status='in_progress').count(),
-            'resolved_tickets': tickets.filter(status='resolved').count(),
-            'overdue_tickets': tickets.filter(
-                due_date__lt=timezone.now(), 
-                status__in=['open', 'in_progress', 'pending']
-            ).count(),
+            'total_tickets': counts['total'],
+            'open_tickets': counts['open'],
+            'in_progress_tickets': counts['in_progress'],
+            'resolved_tickets': counts['resolved'],
+            'overdue_tickets': counts['overdue'],
         })
         
         # Recent tickets
         context['recent_tickets'] = tickets.order_by('-created_at')[:10]
         
-        # Priority distribution
-        priority_stats = tickets.values('priority__name', 'priority__level').annotate(
-            count=Count('id')
-        ).order_by('priority__level')
-        context['priority_stats'] = priority_stats
-        
-        # Status distribution
-        status_stats = tickets.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        context['status_stats'] = status_stats
+        # Priority and status distribution
+        context['priority_stats'] = stats['priority_stats']
+        context['status_stats'] = stats['status_stats']
         
         # My assigned tickets (for agents)
-        if hasattr(user, 'userprofile') and user.userprofile.is_agent:
+        if role.is_agent:
             context['my_assigned_tickets'] = tickets.filter(
                 assigned_to=user
             ).exclude(status__in=['resolved', 'closed']).order_by('-created_at')[:5]
@@ -120,60 +123,41 @@ class TicketListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
+        # Activity is summarized on the ticket row, so no comments are loaded
         queryset = Ticket.objects.select_related(
             'submitter', 'assigned_to', 'priority', 'department', 'category'
-        ).prefetch_related('comments')
-        
-        user = self.request.user
-        
-        # Filter based on user role
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_supervisor:
-                # Supervisors see all tickets
-                pass
-            elif user.userprofile.is_agent:
-                # Agents see tickets in their department or assigned to them
-                queryset = queryset.filter(
-                    Q(assigned_to=user) | 
-                    Q(department=user.userprofile.department)
-                )
-            else:
-                # Regular users see only their tickets
-                queryset = queryset.filter(submitter=user)
-        else:
-            queryset = queryset.filter(submitter=user)
+        )
         
-        # Apply filters
-        form = TicketFilterForm(self.request.GET)
-        if form.is_valid():
-            if form.cleaned_data.get('status'):
-                queryset = queryset.filter(status=form.cleaned_data['status'])
-            if form.cleaned_data.get('priority'):
-                queryset = queryset.filter(priority=form.cleaned_data['priority'])
-            if form.cleaned_data.get('department'):
-                queryset = queryset.filter(department=form.cleaned_data['department'])
-            if form.cleaned_data.get('category'):
-                queryset = queryset.filter(category=form.cleaned_data['category'])
-            if form.cleaned_data.get('assigned_to'):
-                queryset = queryset.filter(assigned_to=form.cleaned_data['assigned_to'])
-            if form.cleaned_data.get('date_from'):
-                queryset = queryset.filter(created_at__date__gte=form.cleaned_data['date_from'])
-            if form.cleaned_data.get('date_to'):
-                queryset = queryset.filter(created_at__date__lte=form.cleaned_data['date_to'])
-            if form.cleaned_data.get('search'):
-                search_term = form.cleaned_data['search']
-                queryset = queryset.filter(
-                    Q(title__icontains=search_term) |
-                    Q(description__icontains=search_term) |
-                    Q(ticket_number__icontains=search_term)
-                )
+        # Role scope plus the filter form, shared with the CSV export
+        return TicketFilterForm(self.request.GET).filter_queryset(queryset, self.request.role)
+    
+    def use_cursor_pagination(self):
+        # Cursors walk (created_at, id); search results are ordered by rank,
+        # which moves whenever the index changes, so they are paged by number
+        if self.request.GET.get('search', '').strip():
+            return False
+        mode = self.request.GET.get('pagination') or getattr(settings, 'TICKET_LIST_PAGINATION', 'page')
+        return mode == 'cursor'
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
         
-        return queryset.order_by('-created_at')
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        return (paginator, page, page.object_list, page.has_other_pages())
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['filter_form'] = TicketFilterForm(self.request.GET)
         context['bulk_action_form'] = BulkTicketActionForm()
+        context['cursor_pagination'] = self.use_cursor_pagination()
+        
+        # Rights for the whole page at once, instead of a check per row
+        self.request.role.annotate(context['tickets'])
         return context
 
 
@@ -192,50 +176,28 @@ class TicketDetailView(LoginRequiredMixin, DetailView):
             'history__user'
         )
         
-        user = self.request.user
-        
-        # Filter based on user role
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_supervisor:
-                return queryset
-            elif user.userprofile.is_agent:
-                return queryset.filter(
-                    Q(assigned_to=user) | 
-                    Q(department=user.userprofile.department)
-                )
-        
-        return queryset.filter(submitter=user)
+        return self.request.role.filter_visible(queryset)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
+        role = self.request.role
         
         # Comments (filter internal comments for non-agents)
         comments = self.object.comments.all()
-        if not (hasattr(user, 'userprofile') and 
-                (user.userprofile.is_agent or user.userprofile.is_supervisor)):
+        if not role.can_see_internal_notes():
             comments = comments.filter(is_internal=False)
         
         context.update({
             'comments': comments,
             'comment_form': TicketCommentForm(user=user),
             'attachment_form': TicketAttachmentForm(user=user),
-            'can_edit': self.can_edit_ticket(user),
+            'can_edit': role.can_edit(self.object),
             'can_comment': True,
             'ticket_history': self.object.history.all()[:10],
         })
         
         return context
-    
-    def can_edit_ticket(self, user):
-        """Check if user can edit this ticket"""
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_supervisor:
-                return True
-            elif user.userprofile.is_agent:
-                return (self.object.assigned_to == user or 
-                       self.object.department == user.userprofile.department)
-        return self.object.submitter == user
 
 
 class TicketCreateView(LoginRequiredMixin, CreateView):
@@ -264,17 +226,7 @@ class TicketUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'tickets/ticket_form.html'
     
     def test_func(self):
-        ticket = self.get_object()
-        user = self.request.user
-        
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_supervisor:
-                return True
-            elif user.userprofile.is_agent:
-                return (ticket.assigned_to == user or 
-                       ticket.department == user.userprofile.department)
-        
-        return ticket.submitter == user
+        return self.request.role.can_edit(self.get_object())
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -297,16 +249,7 @@ def add_ticket_comment(request, pk):
     
     # Check permissions
     user = request.user
-    can_comment = False
-    
-    if hasattr(user, 'userprofile'):
-        if user.userprofile.is_supervisor:
-            can_comment = True
-        elif user.userprofile.is_agent:
-            can_comment = (ticket.assigned_to == user or 
-                          ticket.department == user.userprofile.department)
-    
-    if not can_comment and ticket.submitter != user:
+    if not request.role.can_comment(ticket):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
     form = TicketCommentForm(request.POST, user=user)
@@ -319,13 +262,7 @@ def add_ticket_comment(request, pk):
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': True,
-                'comment': {
-                    'id': comment.id,
-                    'author': comment.author.get_full_name(),
-                    'comment': comment.comment,
-                    'is_internal': comment.is_internal,
-                    'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M'),
-                }
+                'comment': comment_payload(comment),
             })
         
         messages.success(request, 'Comment added successfully!')
@@ -340,18 +277,9 @@ def upload_ticket_attachment(request, pk):
     """Upload attachment to ticket"""
     ticket = get_object_or_404(Ticket, pk=pk)
     
-    # Check permissions (same as comment permissions)
+    # Check permissions
     user = request.user
-    can_upload = False
-    
-    if hasattr(user, 'userprofile'):
-        if user.userprofile.is_supervisor:
-            can_upload = True
-        elif user.userprofile.is_agent:
-            can_upload = (ticket.assigned_to == user or 
-                         ticket.department == user.userprofile.department)
-    
-    if not can_upload and ticket.submitter != user:
+    if not request.role.can_upload(ticket):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
     form = TicketAttachmentForm(request.POST, request.FILES, user=user)
@@ -371,11 +299,8 @@ def upload_ticket_attachment(request, pk):
 @require_http_methods(["POST"])
 def bulk_ticket_actions(request):
     """Handle bulk actions on tickets"""
-    user = request.user
-
     # Permission check
-    profile = getattr(user, 'userprofile', None)
-    if not profile or not (profile.is_agent or profile.is_supervisor):
+    if not request.role.is_staff_member:
         messages.error(request, 'Permission denied.')
         return redirect('ticket_list')
 
@@ -388,32 +313,46 @@ def bulk_ticket_actions(request):
 
     if form.is_valid():
         action = form.cleaned_data['action']
-        assigned_to = form.cleaned_data.get('assigned_to')
-        status = form.cleaned_data.get('status')
-        priority = form.cleaned_data.get('priority')
-
-        tickets = Ticket.objects.filter(id__in=ticket_ids)
-        # apply permission restrictions
-        if not profile.is_supervisor:
-            tickets = tickets.filter(Q(assigned_to=user) | Q(department=profile.department))
-
-        with transaction.atomic():
-            if action == 'assign' and assigned_to:
-                updated = tickets.update(assigned_to=assigned_to)
-                messages.success(request, f'Successfully assigned {updated} tickets.')
-            elif action == 'status' and status:
-                updated = tickets.update(status=status)
-                messages.success(request, f'Successfully updated status for {updated} tickets.')
-            elif action == 'priority' and priority:
-                updated = tickets.update(priority=priority)
-                messages.success(request, f'Successfully updated priority for {updated} tickets.')
-            elif action == 'close':
-                updated = tickets.update(status='closed', closed_at=timezone.now())
-                messages.success(request, f'Successfully closed {updated} tickets.')
+        values = action_values(action, form.cleaned_data)
+        ticket_ids = [int(pk) for pk in ticket_ids if pk.isdigit()]
+
+        if values is None:
+            messages.error(request, 'Please choose a value for the selected action.')
+        elif len(ticket_ids) > BULK_ACTION_BACKGROUND_THRESHOLD:
+            # Large selections, e.g. re-assigning a departing agent's tickets
+            job = queue_bulk_action(request.user, action, values, ticket_ids)
+            messages.info(request, f'Updating {len(ticket_ids)} tickets in the background (job #{job.pk}).')
+        else:
+            stats = run_bulk_action(
+                action, values, ticket_ids, user_id=request.user.pk, scope=request.role.visible_q(),
+            )
+            verb = {
+                'assign': 'assigned',
+                'status': 'updated status for',
+                'priority': 'updated priority for',
+                'close': 'closed',
+            }[action]
+            message = f"Successfully {verb} {stats['updated']} tickets."
+            if stats['unchanged'] or stats['skipped']:
+                message += f" {stats['unchanged']} already up to date, {stats['skipped']} not permitted."
+            messages.success(request, message)
 
     return redirect('ticket_list')
 
 
+@login_required
+def bulk_action_status(request, pk):
+    """Progress of a background bulk action started by the user"""
+    job = get_object_or_404(BulkActionJob, pk=pk, user=request.user)
+    return JsonResponse({
+        'status': job.status,
+        'processed': job.processed,
+        'total': len(job.ticket_ids),
+        'stats': job.stats,
+        'error': job.error,
+    })
+
+
 @login_required
 def get_categories_by_department(request):
     department_id = request.GET.get('department_id')
@@ -421,21 +360,27 @@ def get_categories_by_department(request):
 
     categories = []
     if department_id:
-        categories_qs = Category.objects.filter(department_id=department_id, is_active=True)
-
-        # Include the current category if it's not in the active list
+        try:
+            department_id = int(department_id)
+        except ValueError:
+            return JsonResponse({'categories': []})
+        
+        current_category_id = None
         if ticket_id:
-            try:
-                ticket = Ticket.objects.get(pk=ticket_id)
-                if ticket.category and ticket.category.department_id == int(department_id):
-                    if not categories_qs.filter(pk=ticket.category.pk).exists():
-                        categories_qs = categories_qs | Category.objects.filter(pk=ticket.category.pk)
-            except Ticket.DoesNotExist:
-                pass
-
-        categories = categories_qs.values('id', 'name').order_by('name')
+            current_category_id = Ticket.objects.filter(pk=ticket_id).values_list('category_id', flat=True).first()
+        
+        # Active categories, plus the ticket's current one if it is inactive
+        categories = sorted(
+            (
+                {'id': category.id, 'name': category.name}
+                for category in get_reference_data().categories
+                if category.department_id == department_id and
+                (category.is_active or category.id == current_category_id)
+            ),
+            key=lambda category: category['name'],
+        )
 
-    return JsonResponse({'categories': list(categories)})
+    return JsonResponse({'categories': categories})
 
 
 class UserProfileView(LoginRequiredMixin, FormView):
@@ -509,7 +454,7 @@ class KnowledgeBaseListView(ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True)
+        context['categories'] = get_reference_data().active_categories
         context['search_query'] = self.request.GET.get('search', '')
         context['selected_category'] = self.request.GET.get('category', '')
         return context
@@ -540,9 +485,7 @@ class KnowledgeBaseCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateVie
     template_name = 'kb/kb_form.html'
     
     def test_func(self):
-        return (hasattr(self.request.user, 'userprofile') and 
-                (self.request.user.userprofile.is_agent or 
-                 self.request.user.userprofile.is_supervisor))
+        return self.request.role.is_staff_member
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -565,13 +508,12 @@ class KnowledgeBaseUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateVie
     
     def test_func(self):
         article = self.get_object()
-        user = self.request.user
+        role = self.request.role
         
-        if hasattr(user, 'userprofile'):
-            if user.userprofile.is_supervisor:
-                return True
-            elif user.userprofile.is_agent:
-                return article.author == user
+        if role.is_supervisor:
+            return True
+        elif role.is_agent:
+            return article.author_id == role.user_id
         
         return False
     
@@ -613,9 +555,13 @@ class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     template_name = 'reports/reports.html'
     
     def test_func(self):
-        return (hasattr(self.request.user, 'userprofile') and 
-                (self.request.user.userprofile.is_agent or 
-                 self.request.user.userprofile.is_supervisor))
+        return self.request.role.is_staff_member
+    
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Per-section query times, visible in the browser's network panel
+        response['Server-Timing'] = self.report_timings
+        return response
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -623,91 +569,29 @@ class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         # Date range from request
         date_from = self.request.GET.get('date_from')
         date_to = self.request.GET.get('date_to')
+        default_from, default_to = default_window()
         
         if not date_from:
-            date_from = (timezone.now() - timedelta(days=30)).date()
+            date_from = default_from
         else:
             date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
         
         if not date_to:
-            date_to = timezone.now().date()
+            date_to = default_to
         else:
             date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
         
-        # Base queryset
-        tickets = Ticket.objects.filter(
-            created_at__date__range=[date_from, date_to]
-        )
-        
-        # Filter by user's department if not supervisor
-        user = self.request.user
-        if hasattr(user, 'userprofile') and not user.userprofile.is_supervisor:
-            tickets = tickets.filter(department=user.userprofile.department)
-        
-        # Statistics
-        total_tickets = tickets.count()
-        resolved_tickets = tickets.filter(status='resolved').count()
-        closed_tickets = tickets.filter(status='closed').count()
-        overdue_tickets = tickets.filter(
-            due_date__lt=timezone.now(),
-            status__in=['open', 'in_progress', 'pending']
-        ).count()
-        
-        # Resolution rate
-        resolution_rate = 0
-        if total_tickets > 0:
-            resolution_rate = round((resolved_tickets + closed_tickets) / total_tickets * 100, 1)
-        
-        # Average resolution time
-        resolved_ticket_times = tickets.filter(
-            status__in=['resolved', 'closed'],
-            resolved_at__isnull=False
-        ).annotate(
-            resolution_time=F('resolved_at') - F('created_at')
-        ).values_list('resolution_time', flat=True)
-        
-        avg_resolution_time = None
-        if resolved_ticket_times:
-            total_seconds = sum(rt.total_seconds() for rt in resolved_ticket_times)
-            avg_seconds = total_seconds / len(resolved_ticket_times)
-            avg_resolution_time = round(avg_seconds / 3600, 1)  # Convert to hours
-        
-        # Tickets by department
-        dept_stats = tickets.values('department__name').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        # Tickets by priority
-        priority_stats = tickets.values('priority__name', 'priority__level').annotate(
-            count=Count('id')
-        ).order_by('priority__level')
-        
-        # Tickets by status
-        status_stats = tickets.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        
-        # Top agents by tickets resolved
-        agent_stats = tickets.filter(
-            status__in=['resolved', 'closed'],
-            assigned_to__isnull=False
-        ).values('assigned_to__first_name', 'assigned_to__last_name').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
+        # Filter by user's department if not supervisor; agents without one
+        # get an empty report
+        role = self.request.role
+        department_id = ALL_DEPARTMENTS if role.is_supervisor else role.department_id
         
+        report, self.report_timings = get_report(date_from, date_to, department_id)
+        context.update(report)
         context.update({
             'date_from': date_from,
             'date_to': date_to,
-            'total_tickets': total_tickets,
-            'resolved_tickets': resolved_tickets,
-            'closed_tickets': closed_tickets,
-            'overdue_tickets': overdue_tickets,
-            'resolution_rate': resolution_rate,
-            'avg_resolution_time': avg_resolution_time,
-            'dept_stats': dept_stats,
-            'priority_stats': priority_stats,
-            'status_stats': status_stats,
-            'agent_stats': agent_stats,
+            'backlog': get_backlog(department_id),
         })
         
         return context
@@ -715,59 +599,80 @@ class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
 
 @login_required
 def export_tickets_csv(request):
-    """Export tickets to CSV"""
-    import csv
-    from django.http import HttpResponse
-    
-    user = request.user
+    """
+    Export the tickets matching the ticket list filters to CSV.
+
+    The file is streamed as it is read from the database, so memory use
+    does not grow with the number of tickets. ``?compress=gzip`` sends it
+    gzipped.
+    """
+    role = request.role
     
     # Check permissions
-    if not (hasattr(user, 'userprofile') and 
-            (user.userprofile.is_agent or user.userprofile.is_supervisor)):
+    if not role.is_staff_member:
         return HttpResponse('Permission denied', status=403)
     
-    # Get tickets based on user permissions
-    tickets = Ticket.objects.select_related(
-        'submitter', 'assigned_to', 'priority', 'department', 'category'
-    )
+    form = TicketFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponse('Invalid filters', status=400)
+    tickets = form.filter_queryset(Ticket.objects.all(), role)
+    
+    compress = request.GET.get('compress') == 'gzip'
+    chunks = csv_chunks(export_rows(tickets), compress=compress)
+    if isinstance(request, ASGIRequest):
+        chunks = async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type='application/gzip' if compress else 'text/csv')
+    filename = 'tickets_export.csv.gz' if compress else 'tickets_export.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def queue_ticket_export(request):
+    """
+    Start a background export of the filtered tickets; the filters come in
+    the query string, as for the CSV export, and ``format`` in the body.
+    """
+    if not request.role.is_staff_member:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    if not user.userprofile.is_supervisor:
-        tickets = tickets.filter(department=user.userprofile.department)
-    
-    # Apply filters from request
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    
-    if date_from:
-        tickets = tickets.filter(created_at__date__gte=date_from)
-    if date_to:
-        tickets = tickets.filter(created_at__date__lte=date_to)
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="tickets_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Ticket Number', 'Title', 'Status', 'Priority', 'Department', 
-        'Category', 'Submitter', 'Assigned To', 'Created At', 'Resolved At'
-    ])
-    
-    for ticket in tickets:
-        writer.writerow([
-            ticket.ticket_number,
-            ticket.title,
-            ticket.get_status_display(),
-            ticket.priority.name,
-            ticket.department.name,
-            ticket.category.name,
-            ticket.submitter.get_full_name(),
-            ticket.assigned_to.get_full_name() if ticket.assigned_to else 'Unassigned',
-            ticket.created_at.strftime('%Y-%m-%d %H:%M'),
-            ticket.resolved_at.strftime('%Y-%m-%d %H:%M') if ticket.resolved_at else '',
-        ])
+    form = TicketFilterForm(request.GET)
+    export_format = request.POST.get('format', 'csv')
+    if not form.is_valid() or export_format not in dict(ExportJob.FORMAT_CHOICES):
+        return JsonResponse({'error': 'Invalid export'}, status=400)
     
-    return response
+    job, created = queue_export(request.user, export_format, filter_params(form))
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'reused': not created,
+        'status_url': reverse('export_job_status', kwargs={'pk': job.pk}),
+    }, status=202 if created else 200)
+
+
+@login_required
+def export_job_status(request, pk):
+    """Progress of an export started by the user"""
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    return JsonResponse({
+        'status': job.status,
+        'format': job.format,
+        'rows_written': job.rows_written,
+        'total': job.total,
+        'error': job.error,
+        'download_url': reverse('download_ticket_export', kwargs={'pk': job.pk}) if job.status == 'done' else None,
+    })
+
+
+@login_required
+def download_ticket_export(request, pk):
+    """The finished export file; only its owner may fetch it"""
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user, status='done')
+    return FileResponse(
+        job.file.open('rb'), as_attachment=True, filename=f'tickets_export.{job.format}',
+        content_type='application/x-ndjson' if job.format == 'jsonl' else 'text/csv',
+    )
 
 
 # Error handling views
@@ -782,36 +687,102 @@ def handler500(request):
 
 
 # AJAX utility views
+def _stats_scope(role):
+    """Version scopes, scoped tickets and stats callable for the user's role"""
+    # Agent and supervisor scopes are read from the counter table
+    if role.is_supervisor:
+        tickets = Ticket.objects.all()  # Supervisors see all
+        return ['all'], tickets, counter_ticket_stats
+    elif role.is_agent:
+        department_id = role.department_id
+        scope = Q(assigned_to_id=role.user_id) | Q(department_id=department_id)
+        tickets = Ticket.objects.filter(scope)
+        return [f'department:{department_id}', f'agent:{role.user_id}'], tickets, lambda: counter_ticket_stats(scope)
+    
+    tickets = Ticket.objects.filter(submitter_id=role.user_id)
+    return [f'submitter:{role.user_id}'], tickets, lambda: compute_ticket_stats(tickets)
+
+
 @login_required
 def get_ticket_stats(request):
-    user = request.user
+    scopes, tickets, compute = _stats_scope(request.role)
+    stats, etag = get_cached_stats(scopes, tickets, compute)
     
-    # Base queryset
-    tickets = Ticket.objects.all()
-    
-    # Filter based on user role
-    if hasattr(user, 'userprofile'):
-        if user.userprofile.is_supervisor:
-            pass  # Supervisors see all
-        elif user.userprofile.is_agent:
-            tickets = tickets.filter(
-                Q(assigned_to=user) | 
-                Q(department=user.userprofile.department)
-            )
-        else:
-            tickets = tickets.filter(submitter=user)
-    else:
-        tickets = tickets.filter(submitter=user)
-    
-    stats = {
-        'total': tickets.count(),
-        'open': tickets.filter(status='open').count(),
-        'in_progress': tickets.filter(status='in_progress').count(),
-        'resolved': tickets.filter(status='resolved').count(),
-        'overdue': tickets.filter(
-            due_date__lt=timezone.now(),
-            status__in=['open', 'in_progress', 'pending']
-        ).count(),
-    }
-    
-    return JsonResponse(stats)
\ No newline at end of file
+    response = JsonResponse(stats)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+# Live update streams (server-sent events, ASGI only)
+STREAM_KEEPALIVE = 30
+
+
+def _event_stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+async def ticket_stats_stream(request):
+    """Push the dashboard counters whenever a ticket in the user's scope changes"""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI a stream would pin a worker thread; 204 tells the
+        # browser not to reconnect so the dashboard falls back to polling
+        return HttpResponse(status=204)
+    
+    role = await sync_to_async(get_role)(await request.auser())
+    scopes, tickets, compute = _stats_scope(role)
+    subscription = get_broker().subscribe(f'stats:{scope}' for scope in scopes)
+    
+    async def stream():
+        async with subscription:
+            last_etag = None
+            while True:
+                # Re-read on every event and keepalive; the overdue count
+                # also changes with time alone
+                stats, etag = await sync_to_async(get_cached_stats)(scopes, tickets, compute)
+                if etag != last_etag:
+                    last_etag = etag
+                    yield format_sse('stats', stats)
+                else:
+                    yield ': keepalive\n\n'
+                await subscription.get(STREAM_KEEPALIVE)
+    
+    return _event_stream_response(stream())
+
+
+def _comment_stream_access(user, pk):
+    """Whether the user may see internal notes; 404 if the ticket is hidden"""
+    role = get_role(user)
+    if not role.filter_visible(Ticket.objects.filter(pk=pk)).exists():
+        raise Http404
+    return role.can_see_internal_notes()
+
+
+@login_required
+async def ticket_comment_stream(request, pk):
+    """Push comments added to a ticket to everyone viewing it"""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    can_see_internal = await sync_to_async(_comment_stream_access)(user, pk)
+    subscription = get_broker().subscribe([f'ticket:{pk}'])
+    
+    async def stream():
+        async with subscription:
+            yield ': connected\n\n'
+            while True:
+                item = await subscription.get(STREAM_KEEPALIVE)
+                if item is None:
+                    yield ': keepalive\n\n'
+                    continue
+                channel, comment = item
+                if comment['is_internal'] and not can_see_internal:
+                    continue
+                yield format_sse('comment', comment)
+    
+    return _event_stream_response(stream())